@@ -4,20 +4,25 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.graph import END, StateGraph
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.agents import AgentAction, AgentFinish
+import asyncio
+import contextlib
+import functools
 import json
-from watson_llm import watsonx_llm
+import os
+import shutil
+import time
+import uuid
+from watson_llm import get_watsonx_llm
 from prompts.system_prompt import system_template
+from serialization import to_prompt
+from spill import SpilledResult, maybe_spill, resolve_spilled, spill_root
+from tracing import estimate_tokens, metrics, tracer
+from recording import agent_record_path, get_session_recorder
+from prefetch import SpeculativeWarmup, agent_prefetch, default_warmup_tasks
 from langchain_core.tools import tool
 
-from tools.pythontool import execute_python_code
-from tools.llm_tool import llm_engine_tool
-from tools.validate_code import validate_python_code_tool
-from tools.mysql_tool import SQLExecutorTool,sql_validator
-from tools.mysql_setup import get_mysql_database_schema
-
-sql_executor = SQLExecutorTool()
-
-tools = [execute_python_code, validate_python_code_tool, llm_engine_tool,sql_executor,sql_validator,get_mysql_database_schema]
+# Tools are declared here and imported on first use, keeping worker start-up fast
+from tools.registry import TOOL_SPECS, LazyToolRegistry
 
 
 class AgentState(TypedDict):
@@ -29,6 +34,7 @@ class AgentState(TypedDict):
     tools_used: List[str]
     intermediate_results: Dict[str, Any]
     final_response: str
+    spill_dir: str
 
 # Function to create agent prompt
 def create_agent_prompt() -> ChatPromptTemplate:
@@ -40,18 +46,23 @@ def create_agent_prompt() -> ChatPromptTemplate:
     ])
     return prompt
 
-def create_planning_prompt() -> ChatPromptTemplate:
-    """Creates the prompt for task planning."""
+def create_planning_prompt(tool_descriptions: Dict[str, str] = None) -> ChatPromptTemplate:
+    """
+    Creates the prompt for task planning. The tools listed are the registry's
+    (tools.registry.TOOL_SPECS) unless tool_descriptions maps other names to descriptions.
+    """
+    if tool_descriptions is None:
+        tool_descriptions = {spec.name: spec.description for spec in TOOL_SPECS}
+    # Braces in descriptions would be read as template variables
+    tool_lines = "\n".join(
+        f"    - {name}: {description}".replace("{", "{{").replace("}", "}}")
+        for name, description in tool_descriptions.items()
+    )
     planning_template = """Given the user's request, break it down into a sequence of steps that can 
     be executed using the available tools:
 
     Tools available:
-    - execute_python_code: Executes Python code
-    - validate_python_code_tool: Validates Python code before execution
-    - llm_engine_tool: Uses LLM for analysis and reasoning
-    - sql_executor: Executes SQL queries
-    - sql_validator: Validates SQL queries
-    - get_mysql_database_schema: Retrieves database schema
+""" + tool_lines + """
 
     User request: {input}
     
@@ -63,30 +74,60 @@ def create_planning_prompt() -> ChatPromptTemplate:
         MessagesPlaceholder(variable_name="messages")
     ])
 
-from langchain.globals import set_debug
-from langchain.globals import set_verbose
-set_debug(True)
-set_verbose(True)
-
-class MultiToolAgent:
+# Full langchain debug logging is expensive on every call, so it is opt-in
+if os.getenv("agent_debug") == "1":
+    from langchain.globals import set_debug
+    from langchain.globals import set_verbose
     set_debug(True)
     set_verbose(True)
-    def __init__(self, llm=watsonx_llm):
-        self.llm = llm
-        self.tools = {getattr(tool, 'name', str(tool)): tool for tool in tools}
+
+llm_max_concurrency = int(os.getenv("llm_max_concurrency", 8))
+
+class MultiToolAgent:
+    def __init__(self, llm=None, tools=None, recorder=None, prefetch=None):
+        self._llm = llm
+        if tools is None:
+            self.tools = LazyToolRegistry()
+        else:
+            self.tools = {getattr(tool, 'name', str(tool)): tool for tool in tools}
+        self.llm_slots = asyncio.Semaphore(llm_max_concurrency)
+        # Records LLM and tool traffic for later replay; see recording.py
+        if recorder is None and agent_record_path:
+            recorder = get_session_recorder(agent_record_path)
+        self.recorder = recorder or None
+        # Warm-up run alongside planning (see prefetch.py): a function from the query to
+        # warm-up tasks, or False. By default only the env-configured tools are warmed.
+        if prefetch is None:
+            prefetch = default_warmup_tasks if tools is None and agent_prefetch else False
+        self.prefetch = prefetch
         self.prompt = create_agent_prompt()
-        self.planning_prompt = create_planning_prompt()
+        self.planning_prompt = create_planning_prompt(None if tools is None else self._tool_descriptions())
         self.graph = self._build_graph()
+
+    def _tool_descriptions(self) -> Dict[str, str]:
+        """Names and one-line descriptions of explicitly given tools, for the planning prompt."""
+        registered = {spec.name: spec.description for spec in TOOL_SPECS}
+        return {
+            name: registered.get(name) or (getattr(tool, "description", "") or name).strip().splitlines()[0]
+            for name, tool in self.tools.items()
+        }
+
+    @property
+    def llm(self):
+        """The LLM; the default watsonx client is only built when the first call is made."""
+        if self._llm is None:
+            self._llm = get_watsonx_llm()
+        return self._llm
         
     def _build_graph(self) -> StateGraph:
         """Builds the agent's workflow graph."""
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("plan", self._plan_execution)
-        workflow.add_node("execute", self._execute_step)
-        workflow.add_node("analyze", self._analyze_results)
-        workflow.add_node("respond", self._generate_response)
+        workflow.add_node("plan", self._traced_node("plan", self._plan_execution))
+        workflow.add_node("execute", self._traced_node("execute", self._execute_step))
+        workflow.add_node("analyze", self._traced_node("analyze", self._analyze_results))
+        workflow.add_node("respond", self._traced_node("respond", self._generate_response))
         
         # Define edges
         workflow.add_edge("plan", "execute")
@@ -106,14 +147,70 @@ class MultiToolAgent:
         
         return workflow.compile()
 
+    def _traced_node(self, name: str, node):
+        """Wraps a graph node in a node.<name> span."""
+        @functools.wraps(node)
+        async def traced(state: AgentState) -> AgentState:
+            with tracer.span(f"node.{name}", step=state.get("current_step")):
+                return await node(state)
+        return traced
+
+    async def _call_llm(self, prompt: str, purpose: str) -> str:
+        """
+        Calls the LLM through the streaming interface so time to first token can be
+        measured, recording queue wait and estimated token counts on an llm.call span.
+        """
+        with tracer.span("llm.call", purpose=purpose) as span:
+            queued = time.perf_counter()
+            async with self.llm_slots:
+                started = time.perf_counter()
+                queue_wait_ms = (started - queued) * 1000
+                ttft_ms = None
+                chunks = []
+                async for chunk in self.llm.astream(prompt):
+                    if not chunks:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                        span.set(ttft_ms=ttft_ms)
+                        metrics.observe("llm.ttft.ms", ttft_ms)
+                    chunks.append(getattr(chunk, "content", chunk))
+                duration_ms = (time.perf_counter() - started) * 1000
+            response = "".join(chunks)
+            if self.recorder is not None:
+                self.recorder.record_llm(purpose, prompt, response, duration_ms, ttft_ms)
+            tokens_in, tokens_out = estimate_tokens(prompt), estimate_tokens(response)
+            span.set(queue_wait_ms=queue_wait_ms, tokens_in=tokens_in, tokens_out=tokens_out)
+            metrics.observe("llm.queue_wait.ms", queue_wait_ms)
+            metrics.increment("llm.calls")
+            metrics.increment("llm.tokens_in", tokens_in)
+            metrics.increment("llm.tokens_out", tokens_out)
+        return response
+
+    async def _call_tool(self, name: str, tool_input: Any) -> Any:
+        """Invokes a tool inside a tool.call span, recording the call when a recorder is set."""
+        tool = self.tools[name]
+        with tracer.span("tool.call", tool=name):
+            started = time.perf_counter()
+            try:
+                result = await tool.ainvoke(tool_input)
+            except Exception as e:
+                if self.recorder is not None:
+                    duration_ms = (time.perf_counter() - started) * 1000
+                    self.recorder.record_tool(name, tool_input, None, duration_ms, error=str(e))
+                raise
+            if self.recorder is not None:
+                duration_ms = (time.perf_counter() - started) * 1000
+                self.recorder.record_tool(name, tool_input, result, duration_ms)
+        return result
+
     async def _plan_execution(self, state: AgentState) -> AgentState:
         """Plans the execution steps for the query."""
         messages = state["messages"]
-        planning_response = await self.llm.ainvoke(
+        planning_response = await self._call_llm(
             self.planning_prompt.format(
                 input=messages[-1].content,
                 messages=messages
-            )
+            ),
+            purpose="plan"
         )
         
         try:
@@ -164,11 +261,13 @@ class MultiToolAgent:
                     "final_response": tool_choice.return_values["output"]
                 }
             
-            # Execute the tool
-            tool = self.tools[tool_choice.tool]
-            result = await tool.ainvoke(tool_choice.tool_input)
+            # Execute the tool, with any spilled result it names loaded back in
+            tool_input = resolve_spilled(tool_choice.tool_input, state["intermediate_results"])
+            result = await self._call_tool(tool_choice.tool, tool_input)
             state["tools_used"].append(tool_choice.tool)
-            state["intermediate_results"][current_step] = result
+            # Large row sets go to disk; the state keeps a handle and summary
+            with tracer.span("tool.serialize", tool=tool_choice.tool):
+                state["intermediate_results"][current_step] = maybe_spill(result, state["spill_dir"])
             
         except Exception as e:
             # Always store a result, even if it's an error
@@ -185,38 +284,51 @@ class MultiToolAgent:
         messages = state["messages"]
         
         # Add result to messages for context
-        messages.append(AIMessage(content=f"Step result: {current_results}"))
+        messages.append(AIMessage(content=f"Step result: {to_prompt(current_results)}"))
+
+        # Advance here rather than in _should_continue: state changes made in a
+        # conditional edge are not persisted by the graph
+        current_step_idx = state["planned_steps"].index(state["current_step"])
+        if current_step_idx < len(state["planned_steps"]) - 1:
+            current_step = state["planned_steps"][current_step_idx + 1]
+            next_step = "execute"
+        else:
+            current_step = state["current_step"]
+            next_step = "respond"
         
         return {
             **state,
-            "messages": messages
+            "messages": messages,
+            "current_step": current_step,
+            "next_step": next_step
         }
 
     def _should_continue(self, state: AgentState) -> str:
         """Determines if there are more steps to execute."""
-        current_step_idx = state["planned_steps"].index(state["current_step"])
-        if current_step_idx < len(state["planned_steps"]) - 1:
-            state["current_step"] = state["planned_steps"][current_step_idx + 1]
+        if state["next_step"] == "execute":
             return "continue"
         return "finish"
 
     async def _generate_response(self, state: AgentState) -> AgentState:
         """Generates the final response based on all intermediate results."""
         messages = state["messages"]
-        results = state["intermediate_results"]
+        results = {
+            step: result.for_prompt() if isinstance(result, SpilledResult) else result
+            for step, result in state["intermediate_results"].items()
+        }
         
         response_prompt = f"""Based on the following results, provide a comprehensive answer to the original query:
         
         Original query: {messages[0].content}
         Steps executed: {state['tools_used']}
-        Results: {json.dumps(results, indent=2)}
+        Results: {to_prompt(results)}
         
         Provide a clear and concise response that addresses the original query."""
         
-        final_response = await self.llm.ainvoke(response_prompt)
+        final_response = await self._call_llm(response_prompt, purpose="respond")
         return {
             **state,
-            "final_response": final_response.content
+            "final_response": final_response
         }
 
     async def _select_tool(self, step: str, query: str) -> Union[AgentAction, AgentFinish]:
@@ -227,7 +339,7 @@ class MultiToolAgent:
         Return a JSON with format:
         {{"tool": "tool_name", "input": "tool_input"}}"""
         
-        response = await self.llm.ainvoke(tool_selection_prompt)
+        response = await self._call_llm(tool_selection_prompt, purpose="select_tool")
         
         try:
             # Parse the response directly as JSON
@@ -253,10 +365,23 @@ class MultiToolAgent:
             current_step="",
             tools_used=[],
             intermediate_results={},
-            final_response=""
+            final_response="",
+            spill_dir=os.path.join(spill_root, uuid.uuid4().hex)
         )
         
-        final_state = await self.graph.ainvoke(initial_state)
+        recording = self.recorder.session(query) if self.recorder is not None else contextlib.nullcontext()
+        warmup = None
+        try:
+            with recording as session, tracer.span("agent.run"):
+                if self.prefetch:
+                    warmup = SpeculativeWarmup(self.prefetch(query)).start()
+                final_state = await self.graph.ainvoke(initial_state)
+                if session is not None:
+                    session.final_response = final_state["final_response"]
+        finally:
+            if warmup is not None:
+                warmup.cancel()
+            shutil.rmtree(initial_state["spill_dir"], ignore_errors=True)
         return final_state["final_response"]
 
 # Example usage
@@ -265,7 +390,7 @@ async def main():
     query = "Analyze  sales data , create a visualization, and explain the trends"
     response = await agent.run(query)
     print(f"Final Response: {response}")
+    print(metrics.snapshot())
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,151 @@
+import os
+import random
+import re
+import sqlite3
+import time
+import weakref
+from decimal import Decimal
+from typing import Any, List, Optional
+
+# %s placeholders outside quoted strings, as used by the MySQL drivers
+_PLACEHOLDER_RE = re.compile(r"('(?:[^']|'')*')|%s")
+
+COUNTRIES = ["United States", "United Kingdom", "France", "Germany", "Italy", "Spain",
+             "Canada", "Australia", "Japan", "China"]
+# The MySQL drivers bind exact decimals; SQLite only knows floats
+sqlite3.register_adapter(Decimal, float)
+
+CATEGORIES = ["Kurta", "Set", "Western Dress", "Top", "Ethnic Dress", "Blouse", "Saree", "Bottom"]
+
+
+class FakeCursor:
+    """DB-API cursor over sqlite3 that mimics mysql.connector's dictionary cursor."""
+
+    def __init__(self, connection: "FakeConnection", dictionary: bool = False):
+        # Held weakly like mysql.connector does, so cached cursors never keep a connection alive
+        self._connection = weakref.proxy(connection)
+        self._cursor = connection.raw.cursor()
+        self.dictionary = dictionary
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, operation: str, params: Optional[tuple] = None):
+        if self._connection.query_latency:
+            time.sleep(self._connection.query_latency)
+        operation = _PLACEHOLDER_RE.sub(lambda m: m.group(1) or "?", operation)
+        self._cursor.execute(operation, tuple(params or ()))
+        self.rowcount = self._cursor.rowcount
+
+    def fetchall(self) -> List[Any]:
+        rows = self._cursor.fetchall()
+        if not self.dictionary:
+            return rows
+        columns = [column[0] for column in self._cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class FakeConnection:
+    """Connection to the stand-in database with the subset of the mysql.connector API the tools use."""
+
+    def __init__(self, path: str, query_latency: float = 0.0):
+        self.raw = sqlite3.connect(path, check_same_thread=False)
+        self.query_latency = query_latency
+
+    def cursor(self, dictionary: bool = False, **kwargs) -> FakeCursor:
+        return FakeCursor(self, dictionary=dictionary)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def commit(self) -> None:
+        self.raw.commit()
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+    def close(self) -> None:
+        self.raw.close()
+
+
+class FakeDatabase:
+    """
+    A local SQLite file seeded with synthetic sales data, standing in for the MySQL server.
+
+    :param path: Database file; created and seeded if it does not exist.
+    :param query_latency: Seconds added to every statement to simulate a network round trip.
+    """
+
+    def __init__(self, path: str, rows: int = 10000, seed: int = 42, query_latency: float = 0.0):
+        self.path = path
+        self.query_latency = query_latency
+        if not os.path.exists(path):
+            seed_database(path, rows=rows, seed=seed)
+
+    def connect(self) -> FakeConnection:
+        return FakeConnection(self.path, query_latency=self.query_latency)
+
+
+def seed_database(path: str, rows: int = 10000, seed: int = 42) -> None:
+    """Creates Product, Customer and Sale_Report tables filled with Faker data."""
+    from faker import Faker
+
+    fake = Faker()
+    Faker.seed(seed)
+    rng = random.Random(seed)
+
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE Product (id INTEGER PRIMARY KEY, name TEXT, category TEXT, price REAL);
+        CREATE TABLE Customer (id INTEGER PRIMARY KEY, name TEXT, email TEXT, country TEXT);
+        CREATE TABLE Sale_Report (
+            id INTEGER PRIMARY KEY,
+            order_date TEXT,
+            customer_id INTEGER REFERENCES Customer(id),
+            product_id INTEGER REFERENCES Product(id),
+            country TEXT,
+            quantity INTEGER,
+            amount REAL
+        );
+        """
+    )
+    products = [
+        (i, fake.catch_phrase(), rng.choice(CATEGORIES), round(rng.uniform(5, 500), 2))
+        for i in range(1, 201)
+    ]
+    customers = [
+        (i, fake.name(), fake.email(), rng.choice(COUNTRIES))
+        for i in range(1, max(2, rows // 10) + 1)
+    ]
+    sales = []
+    for i in range(1, rows + 1):
+        product = rng.choice(products)
+        customer = rng.choice(customers)
+        quantity = rng.randint(1, 10)
+        sales.append((
+            i,
+            fake.date_between(start_date="-2y", end_date="today").isoformat(),
+            customer[0],
+            product[0],
+            customer[3],
+            quantity,
+            round(quantity * product[3], 2),
+        ))
+    connection.executemany("INSERT INTO Product VALUES (?, ?, ?, ?)", products)
+    connection.executemany("INSERT INTO Customer VALUES (?, ?, ?, ?)", customers)
+    connection.executemany("INSERT INTO Sale_Report VALUES (?, ?, ?, ?, ?, ?, ?)", sales)
+    connection.commit()
+    connection.close()
+
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Iterator, List, Sequence, Tuple, Union
+
+from tracing import estimate_tokens
+
+Response = Union[str, Callable[[str], str]]
+
+
+class FakeLLM:
+    """
+    Deterministic stand-in for the watsonx LLM.
+
+    Responses are chosen by the first rule whose marker appears in the prompt; a rule's
+    response is either a string or a callable taking the prompt. Each call waits
+    ``first_token_latency`` seconds, then streams the response in chunks at
+    ``tokens_per_second``, so latency scales with output length like a real model.
+    Call and token counts are kept for the benchmark report.
+
+    :param rules: (marker, response) pairs, checked in order.
+    :param default: Response used when no rule matches.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[Tuple[str, Response]] = (),
+        default: Response = "",
+        first_token_latency: float = 0.0,
+        tokens_per_second: float = 0.0,
+        chunk_tokens: int = 8,
+    ):
+        self.rules = list(rules)
+        self.default = default
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = chunk_tokens
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.tokens_in = 0
+            self.tokens_out = 0
+
+    def respond(self, prompt: str) -> str:
+        """Picks the scripted response for a prompt and records the call."""
+        prompt = str(prompt)
+        response = self.default
+        for marker, candidate in self.rules:
+            if marker in prompt:
+                response = candidate
+                break
+        if callable(response):
+            response = response(prompt)
+        with self._lock:
+            self.calls += 1
+            self.tokens_in += estimate_tokens(prompt)
+            self.tokens_out += estimate_tokens(response)
+        return response
+
+    def _chunks(self, response: str) -> Iterator[Tuple[str, float]]:
+        """Yields (chunk, seconds to wait before it)."""
+        size = self.chunk_tokens * 4
+        chunks: List[str] = [response[i:i + size] for i in range(0, len(response), size)] or [""]
+        per_chunk = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        for i, chunk in enumerate(chunks):
+            yield chunk, self.first_token_latency if i == 0 else per_chunk
+
+    def invoke(self, prompt, **kwargs) -> str:
+        response = self.respond(prompt)
+        for _, delay in self._chunks(response):
+            if delay:
+                time.sleep(delay)
+        return response
+
+    async def ainvoke(self, prompt, **kwargs) -> str:
+        response = self.respond(prompt)
+        for _, delay in self._chunks(response):
+            if delay:
+                await asyncio.sleep(delay)
+        return response
+
+    async def astream(self, prompt, **kwargs):
+        for chunk, delay in self._chunks(self.respond(prompt)):
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
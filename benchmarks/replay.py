@@ -0,0 +1,183 @@
+"""
+Replays recorded agent sessions at increasing concurrency.
+
+Sessions recorded with ``agent_record_path`` (see recording.py) are re-run through a
+real MultiToolAgent whose LLM and tools are stand-ins that serve each session its
+recorded responses and results after the recorded latency. Every recorded session is
+started N times for each concurrency level N, at its original offset from the first
+session multiplied by --time-scale (0 starts everything at once). The report shows
+throughput and tail latency as concurrency grows:
+
+    python -m benchmarks.replay sessions.jsonl.gz --concurrency 1,2,4,8,16 --time-scale 0.1
+"""
+import argparse
+import asyncio
+import contextvars
+import os
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+
+from langchain_core.tools import BaseTool, ToolException
+
+from recording import load_sessions
+from serialization import to_json_bytes
+from tracing import Histogram, metrics
+
+_replaying: contextvars.ContextVar = contextvars.ContextVar("replaying_session", default=None)
+
+
+class SessionReplay:
+    """The recorded LLM responses and tool results of one session, consumed in order."""
+
+    def __init__(self, session: Dict[str, Any]):
+        self.llm = deque(session["llm"])
+        self.tools = defaultdict(deque)
+        for event in session["tools"]:
+            self.tools[event["tool"]].append(event)
+
+    def next_llm(self) -> Optional[Dict[str, Any]]:
+        return self.llm.popleft() if self.llm else None
+
+    def next_tool(self, name: str) -> Optional[Dict[str, Any]]:
+        calls = self.tools.get(name)
+        return calls.popleft() if calls else None
+
+
+class ReplayLLM:
+    """Stand-in LLM returning the current session's next recorded response with its recorded timing."""
+
+    def __init__(self, latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+
+    async def astream(self, prompt, **kwargs):
+        replay = _replaying.get()
+        event = replay.next_llm() if replay is not None else None
+        if event is None:
+            yield ""
+            return
+        duration = event["duration_ms"] / 1000 * self.latency_scale
+        ttft = (event["ttft_ms"] or event["duration_ms"]) / 1000 * self.latency_scale
+        await asyncio.sleep(ttft)
+        yield event["response"]
+        await asyncio.sleep(max(0.0, duration - ttft))
+
+    async def ainvoke(self, prompt, **kwargs) -> str:
+        return "".join([chunk async for chunk in self.astream(prompt)])
+
+
+class ReplayTool(BaseTool):
+    """Stand-in for a recorded tool (database, sandbox, ...) returning the recorded result."""
+
+    name: str
+    description: str = "Returns recorded results"
+    handle_tool_error: bool = True
+    latency_scale: float = 1.0
+
+    def _run(self, *args, **kwargs) -> Any:
+        raise NotImplementedError("ReplayTool is async only")
+
+    async def _arun(self, *args, **kwargs) -> Any:
+        replay = _replaying.get()
+        event = replay.next_tool(self.name) if replay is not None else None
+        if event is None:
+            raise ToolException(f"No recorded call left for {self.name}")
+        await asyncio.sleep(event["duration_ms"] / 1000 * self.latency_scale)
+        if event["error"]:
+            raise ToolException(event["error"])
+        return event["result"]
+
+
+async def replay_level(agent, sessions: List[Dict[str, Any]], concurrency: int, time_scale: float) -> Dict[str, Any]:
+    """Replays every session ``concurrency`` times and summarizes latency and throughput."""
+    latencies = Histogram()
+    errors = 0
+    first_start = sessions[0]["time"]
+
+    async def replay_one(session: Dict[str, Any], delay: float) -> None:
+        nonlocal errors
+        await asyncio.sleep(delay)
+        _replaying.set(SessionReplay(session))
+        started = time.perf_counter()
+        try:
+            await agent.run(session["query"])
+        except Exception:
+            errors += 1
+        latencies.observe((time.perf_counter() - started) * 1000)
+
+    metrics.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        replay_one(session, (session["time"] - first_start) * time_scale)
+        for session in sessions
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    queue_wait = metrics.snapshot()["histograms"].get("llm.queue_wait.ms", {})
+    return {
+        "concurrency": concurrency,
+        "sessions": latencies.count,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "sessions_per_s": latencies.count / elapsed if elapsed else 0.0,
+        "p50_ms": latencies.quantile(0.5),
+        "p95_ms": latencies.quantile(0.95),
+        "p99_ms": latencies.quantile(0.99),
+        "max_ms": latencies.max,
+        "llm_queue_p95_ms": queue_wait.get("p95", 0.0),
+    }
+
+
+async def replay(path: str, levels: List[int], time_scale: float, latency_scale: float) -> List[Dict[str, Any]]:
+    from agent import MultiToolAgent
+
+    sessions = [session for session in load_sessions(path) if session["end"] is not None]
+    if not sessions:
+        raise SystemExit(f"No complete sessions in {path}")
+    tool_names = sorted({event["tool"] for session in sessions for event in session["tools"]})
+    agent = MultiToolAgent(
+        llm=ReplayLLM(latency_scale=latency_scale),
+        tools=[ReplayTool(name=name, latency_scale=latency_scale) for name in tool_names],
+        recorder=False,
+    )
+
+    recorded = Histogram()
+    for session in sessions:
+        recorded.observe(session["end"]["duration_ms"])
+    print(f"{len(sessions)} recorded sessions, recorded p50 {recorded.quantile(0.5):.1f}ms "
+          f"p95 {recorded.quantile(0.95):.1f}ms")
+    # One unmeasured replay of every session, started at once, to warm imports, pools and caches
+    await replay_level(agent, sessions, 1, 0.0)
+    return [await replay_level(agent, sessions, level, time_scale) for level in levels]
+
+
+def main(argv=None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="Session log written with agent_record_path.")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated replay multipliers.")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiplier on the recorded gaps between session starts (0: all at once).")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier on recorded LLM and tool latencies.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+    recording_path = os.path.abspath(args.recording)
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+
+    # Spill files go to a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="agent-replay-"))
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = asyncio.run(replay(recording_path, levels, args.time_scale, args.latency_scale))
+
+    from tabulate import tabulate
+
+    print(tabulate([list(result.values()) for result in results], headers=list(results[0]), floatfmt=".1f"))
+    if json_path:
+        with open(json_path, "wb") as f:
+            f.write(to_json_bytes(results, indent=True))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Offline end-to-end benchmarks for MultiToolAgent.
+
+Runs scripted scenarios against a FakeLLM and a Faker-seeded SQLite stand-in for
+MySQL, and reports latency percentiles, LLM calls, tokens and peak memory per
+scenario. No watsonx credentials or database server are needed:
+
+    python -m benchmarks.run --iterations 20 --llm-latency 0.05 --tokens-per-second 200
+    python -m benchmarks.run --scenario single_query --json bench.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from benchmarks.fake_db import FakeDatabase
+from benchmarks.fake_llm import FakeLLM
+from benchmarks.scenarios import SCENARIOS, Scenario
+from serialization import to_json_bytes
+from tracing import Histogram, metrics, tracer
+
+
+def build_tools(database: FakeDatabase) -> List[Any]:
+    """The agent's tools, with SQL pointed at the stand-in database."""
+    from tools.mysql_tool import SQLExecutorTool
+    from tools.pythontool import execute_python_code
+    from tools.validate_code import validate_python_code_tool
+
+    return [SQLExecutorTool(connection_factory=database.connect), execute_python_code, validate_python_code_tool]
+
+
+async def _timed_run(agent, query: str, latencies: Histogram) -> None:
+    started = time.perf_counter()
+    await agent.run(query)
+    latencies.observe((time.perf_counter() - started) * 1000)
+
+
+def build_prefetch(database: FakeDatabase):
+    """Warm-up tasks for the stand-in database; the schema tool needs a MySQL server, so it is left out."""
+    from prefetch import default_warmup_tasks
+
+    return lambda question: default_warmup_tasks(question, connection_factory=database.connect, schema=False)
+
+
+async def run_scenario(scenario: Scenario, database: FakeDatabase, iterations: int,
+                       llm_latency: float, tokens_per_second: float, prefetch: bool = True) -> Dict[str, Any]:
+    from agent import MultiToolAgent
+
+    llm = FakeLLM(rules=scenario.rules, first_token_latency=llm_latency, tokens_per_second=tokens_per_second)
+    agent = MultiToolAgent(llm=llm, tools=build_tools(database),
+                           prefetch=build_prefetch(database) if prefetch else False)
+
+    # One unmeasured session to warm imports and caches
+    await agent.run(scenario.query)
+    llm.reset()
+    metrics.reset()
+    tracer.clear()
+
+    latencies = Histogram()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await asyncio.gather(*(
+            _timed_run(agent, scenario.query, latencies) for _ in range(scenario.sessions)
+        ))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    runs = latencies.count
+    return {
+        "scenario": scenario.name,
+        "sessions": scenario.sessions,
+        "runs": runs,
+        "p50_ms": latencies.quantile(0.5),
+        "p95_ms": latencies.quantile(0.95),
+        "p99_ms": latencies.quantile(0.99),
+        "max_ms": latencies.max,
+        "runs_per_s": runs / elapsed if elapsed else 0.0,
+        "llm_calls_per_run": llm.calls / runs,
+        "tokens_in_per_run": llm.tokens_in / runs,
+        "tokens_out_per_run": llm.tokens_out / runs,
+        "peak_mem_mb": peak / (1024 * 1024),
+        "spans": metrics.snapshot()["histograms"],
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    from tabulate import tabulate
+
+    columns = ["scenario", "sessions", "runs", "p50_ms", "p95_ms", "p99_ms", "max_ms", "runs_per_s",
+               "llm_calls_per_run", "tokens_in_per_run", "tokens_out_per_run", "peak_mem_mb"]
+    print(tabulate([[result[c] for c in columns] for result in results], headers=columns, floatfmt=".1f"))
+
+
+def main(argv=None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run; repeat for several. Default: all.")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=10000, help="Rows of synthetic sales data.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds to first token per LLM call.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="LLM streaming rate; 0 is instant.")
+    parser.add_argument("--query-latency", type=float, default=0.0, help="Seconds added to every SQL statement.")
+    parser.add_argument("--no-prefetch", action="store_true", help="Disable the warm-up run alongside planning.")
+    parser.add_argument("--json", dest="json_path", help="Also write the full results to this file.")
+    args = parser.parse_args(argv)
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+
+    # Sandbox runs use this interpreter and everything the tools write (artifacts,
+    # caches, spill files) goes to a scratch directory
+    os.environ.setdefault("sandbox_python", sys.executable)
+    workdir = tempfile.mkdtemp(prefix="agent-bench-")
+    os.chdir(workdir)
+
+    database = FakeDatabase(os.path.join(workdir, "bench.db"), rows=args.rows, query_latency=args.query_latency)
+    results = [
+        asyncio.run(run_scenario(SCENARIOS[name], database, args.iterations, args.llm_latency,
+                                 args.tokens_per_second, prefetch=not args.no_prefetch))
+        for name in (args.scenario or list(SCENARIOS))
+    ]
+    print_report(results)
+    if json_path:
+        with open(json_path, "wb") as f:
+            f.write(to_json_bytes(results, indent=True))
+    return results
+
+
+if __name__ == "__main__":
+    main()
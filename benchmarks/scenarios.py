@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from serialization import to_json
+
+ANALYSIS_CODE = """
+import statistics
+monthly = [120.5, 131.0, 128.7, 140.2, 151.9, 149.3, 160.4, 171.8, 168.2, 180.1, 192.6, 201.3]
+growth = [(b - a) / a * 100 for a, b in zip(monthly, monthly[1:])]
+print("mean growth %.2f%%" % statistics.mean(growth))
+print("stdev growth %.2f%%" % statistics.stdev(growth))
+"""
+
+
+@dataclass
+class Scenario:
+    """
+    A scripted agent session: the planner returns ``steps`` in order, the tool
+    selector picks each step's tool call, and the responder returns ``answer``.
+    ``sessions`` runs of it are started concurrently per iteration.
+    """
+    name: str
+    description: str
+    query: str
+    steps: Dict[str, Dict[str, Any]]
+    answer: str = "Sales are concentrated in a few countries and growing steadily."
+    sessions: int = 1
+
+    @property
+    def rules(self) -> List[Tuple[str, str]]:
+        """FakeLLM rules; the response prompt is matched first since it repeats the query."""
+        rules = [("Based on the following results", self.answer)]
+        rules += [(f"current step '{step}'", to_json(choice)) for step, choice in self.steps.items()]
+        rules.append(("sequence of steps", to_json({"steps": list(self.steps)})))
+        return rules
+
+
+SALES_BY_COUNTRY = {
+    "tool": "sql_executor",
+    "input": {"query": "SELECT country, SUM(amount) AS total FROM Sale_Report GROUP BY country ORDER BY total DESC"},
+}
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario(
+            name="single_query",
+            description="One aggregate SQL query, then the answer",
+            query="Which countries have the highest total sales?",
+            steps={"fetch_sales": SALES_BY_COUNTRY},
+        ),
+        Scenario(
+            name="multi_step_analysis",
+            description="Detail rows (spilled), a monthly rollup and a Python analysis",
+            query="Analyze sales data, compute monthly growth and explain the trends",
+            steps={
+                "fetch_sales": {
+                    "tool": "sql_executor",
+                    "input": {"query": "SELECT order_date, country, quantity, amount FROM Sale_Report"},
+                },
+                "monthly_totals": {
+                    "tool": "sql_executor",
+                    "input": {"query": "SELECT SUBSTR(order_date, 1, 7) AS month, SUM(amount) AS total "
+                                       "FROM Sale_Report GROUP BY month ORDER BY month"},
+                },
+                "compute_growth": {
+                    "tool": "python_executor",
+                    "input": {"code": ANALYSIS_CODE, "use_cache": False},
+                },
+            },
+        ),
+        Scenario(
+            name="concurrent_sessions",
+            description="Eight single-query sessions at once",
+            query="Which countries have the highest total sales?",
+            steps={"fetch_sales": SALES_BY_COUNTRY},
+            sessions=8,
+        ),
+    ]
+}
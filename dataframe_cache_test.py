@@ -0,0 +1,65 @@
+"""
+The shared DataFrame cache: sessions get private copies, and the memory budget holds.
+Run under pytest:
+
+    python -m pytest dataframe_cache_test.py
+"""
+import pandas as pd
+import pytest
+
+from tools.dataframe_cache import DataFrameCache
+
+
+def frame(rows=3):
+    return pd.DataFrame({"quantity": list(range(1, rows + 1)), "price": [1.5] * rows})
+
+
+def test_session_writes_do_not_reach_the_cache():
+    cache = DataFrameCache()
+    df = cache.get("sales", frame)
+    df.loc[0, "quantity"] = 99
+    df.iloc[1, 1] = 7.0
+    df["price"] = df["price"] * 2
+    df["extra"] = 1
+    cached = cache.get("sales", frame)
+    assert cached["quantity"].tolist() == [1, 2, 3]
+    assert cached["price"].tolist() == [1.5, 1.5, 1.5]
+    assert "extra" not in cached
+
+
+def test_loads_once_per_key():
+    cache = DataFrameCache()
+    calls = []
+    cache.get("sales", lambda: calls.append(1) or frame())
+    cache.get("sales", lambda: calls.append(1) or frame())
+    assert len(calls) == 1
+
+
+def test_least_recently_used_frames_are_evicted_to_fit_the_budget():
+    one = DataFrameCache().get("probe", lambda: frame(1000))
+    size = int(one.memory_usage(deep=True).sum())
+    cache = DataFrameCache(budget_bytes=int(size * 2.5))
+    cache.get("a", lambda: frame(1000))
+    cache.get("b", lambda: frame(1000))
+    cache.get("a", lambda: frame(1000))  # a is now the most recently used
+    cache.get("c", lambda: frame(1000))
+    assert cache.total_bytes <= cache.budget_bytes
+    assert set(cache._entries) == {"a", "c"}
+
+
+def test_frames_larger_than_the_budget_are_not_cached():
+    cache = DataFrameCache(budget_bytes=10)
+    assert len(cache.get("big", lambda: frame(1000))) == 1000
+    assert cache.total_bytes == 0
+
+
+def test_failed_loads_leave_no_lock_behind():
+    cache = DataFrameCache()
+
+    def fail():
+        raise ValueError("no such table")
+
+    with pytest.raises(ValueError):
+        cache.get("missing", fail)
+    assert cache._loading == {}
+    assert cache.get("missing", frame)["quantity"].tolist() == [1, 2, 3]
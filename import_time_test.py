@@ -0,0 +1,60 @@
+"""
+Cold-start budget for the agent.
+
+Importing agent.py in a fresh interpreter must stay under import_budget_seconds and
+must not pull in tool dependencies or LLM clients; those load on first use through
+tools.registry and watson_llm. Run directly or under pytest:
+
+    python import_time_test.py
+"""
+import os
+import subprocess
+import sys
+
+import_budget_seconds = float(os.getenv("import_budget_seconds", 2.0))
+
+HEAVY_MODULES = [
+    "pandasai", "pandas", "numpy", "pyarrow", "matplotlib", "openai", "psycopg2", "pymysql",
+    "mysql.connector", "pyodbc", "langchain_ibm", "ibm_watsonx_ai", "sqlparse",
+]
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import agent
+print(time.perf_counter() - started)
+print(",".join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def measure_agent_import():
+    """Returns (seconds to import agent, heavy modules loaded) measured in a fresh interpreter."""
+    repo_path = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(modules=HEAVY_MODULES)],
+        cwd=repo_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    seconds = float(output[-2])
+    loaded = [name for name in output[-1].split(",") if name]
+    return seconds, loaded
+
+
+def test_agent_import_defers_heavy_modules():
+    _, loaded = measure_agent_import()
+    assert not loaded, f"importing agent loaded: {', '.join(loaded)}"
+
+
+def test_agent_import_within_budget():
+    # Best of three, so a cold disk cache on the first run doesn't fail the check
+    seconds = min(measure_agent_import()[0] for _ in range(3))
+    assert seconds < import_budget_seconds, f"importing agent took {seconds:.2f}s (budget {import_budget_seconds}s)"
+
+
+if __name__ == "__main__":
+    seconds, loaded = measure_agent_import()
+    print(f"import agent: {seconds:.3f}s (budget {import_budget_seconds}s)")
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+    sys.exit(0 if seconds < import_budget_seconds and not loaded else 1)
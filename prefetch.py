@@ -0,0 +1,98 @@
+import asyncio
+import os
+from typing import Any, Callable, Dict, Optional
+
+from tracing import metrics, tracer
+
+# Warm the schema cache, connections and a sandbox worker while the planner runs
+agent_prefetch = os.getenv("agent_prefetch", "1") != "0"
+# Pooled connections to open ahead of the first query
+prefetch_connections = int(os.getenv("prefetch_connections", 2))
+# Also look up row counts of the tables the question names (one information_schema query)
+prefetch_row_counts = os.getenv("prefetch_row_counts", "0") == "1"
+
+
+class SpeculativeWarmup:
+    """
+    Runs blocking warm-up functions in worker threads alongside the agent's planning.
+
+    Every function only fills a process-wide cache (schema index, connection pool,
+    pre-started sandbox worker), so a result nobody uses costs nothing but the work
+    already done, and a failure only means the real call pays the cold start. Errors
+    are counted, never raised.
+
+    :param tasks: Mapping of task name to zero-argument function.
+    """
+
+    def __init__(self, tasks: Dict[str, Callable[[], Any]]):
+        self.tasks = tasks
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+
+    async def _run(self, name: str, function: Callable[[], Any]) -> None:
+        with tracer.span(f"prefetch.{name}") as span:
+            try:
+                self.results[name] = await asyncio.to_thread(function)
+            except Exception as e:
+                self.errors[name] = e
+                metrics.increment("prefetch.errors")
+                span.set(error=f"{type(e).__name__}: {e}")
+
+    def start(self) -> "SpeculativeWarmup":
+        for name, function in self.tasks.items():
+            self._running[name] = asyncio.create_task(self._run(name, function))
+        return self
+
+    def result(self, name: str) -> Optional[Any]:
+        """The task's result, or None if it has not finished or failed."""
+        return self.results.get(name)
+
+    def cancel(self) -> None:
+        """
+        Stops waiting for unfinished tasks. A thread already running finishes in the
+        background and still fills its cache.
+        """
+        for task in self._running.values():
+            task.cancel()
+
+
+def default_warmup_tasks(question: str, connection_factory: Optional[Callable[[], Any]] = None,
+                         schema: bool = True, sandbox: bool = True,
+                         row_counts: bool = prefetch_row_counts) -> Dict[str, Callable[[], Any]]:
+    """
+    The warm-up for one agent run. Tool modules are imported inside the tasks, so in
+    their threads rather than on the event loop.
+
+    :param connection_factory: Connection factory whose pool to warm; the env-configured MySQL server by default.
+    """
+    tasks: Dict[str, Callable[[], Any]] = {}
+
+    if schema:
+        def warm_schema():
+            from tools.mysql_setup import get_schema_index
+
+            return get_schema_index()
+        tasks["schema"] = warm_schema
+
+    def warm_connections():
+        from tools.mysql_tool import get_connection_pool
+
+        return get_connection_pool(connection_factory).warm(prefetch_connections)
+    tasks["connections"] = warm_connections
+
+    if sandbox:
+        def warm_sandbox():
+            from tools.pythontool import prestart_worker
+
+            return prestart_worker()
+        tasks["sandbox"] = warm_sandbox
+
+    if row_counts and question.strip():
+        def probe_rows():
+            from tools.mysql_setup import probe_row_counts
+
+            return probe_row_counts(question)
+        tasks["row_counts"] = probe_rows
+
+    return tasks
@@ -0,0 +1,156 @@
+import atexit
+import contextvars
+import gzip
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from serialization import from_json, to_json_bytes
+
+# Set to a file path (".gz" for compression) to record every agent session
+agent_record_path = os.getenv("agent_record_path")
+
+_current_session: contextvars.ContextVar = contextvars.ContextVar("recorded_session", default=None)
+_recorders: Dict[str, "SessionRecorder"] = {}
+_recorders_lock = threading.Lock()
+
+
+class RecordedSession:
+    """The session being recorded in the current context."""
+
+    def __init__(self, query: str):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.started = time.time()
+        self.started_perf = time.perf_counter()
+        self.final_response: Optional[str] = None
+
+    def offset_ms(self) -> float:
+        return (time.perf_counter() - self.started_perf) * 1000
+
+
+class SessionRecorder:
+    """
+    Records agent sessions to a JSON-lines log, one event per line: session start and end,
+    every LLM call (prompt, response, latency, time to first token) and every tool call
+    (input, result, latency, error). Paths ending in ``.gz`` are gzip-compressed, which
+    keeps repeated row keys and prompt boilerplate cheap.
+
+    Use one recorder per file (see get_session_recorder): concurrent sessions are
+    interleaved in the log and told apart by their session id.
+    """
+
+    def __init__(self, path: str, record_prompts: bool = True):
+        self.path = path
+        self.record_prompts = record_prompts
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = gzip.open(path, "ab") if path.endswith(".gz") else open(path, "ab")
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        line = to_json_bytes(event) + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    @contextmanager
+    def session(self, query: str) -> Iterator[RecordedSession]:
+        """Records everything done in this context as one session."""
+        session = RecordedSession(query)
+        token = _current_session.set(session)
+        self._write({"type": "session_start", "session": session.id, "time": session.started, "query": query})
+        error = None
+        try:
+            yield session
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_session.reset(token)
+            self._write({
+                "type": "session_end",
+                "session": session.id,
+                "duration_ms": session.offset_ms(),
+                "final_response": session.final_response,
+                "error": error,
+            })
+
+    def record_llm(self, purpose: str, prompt: Any, response: str, duration_ms: float,
+                   ttft_ms: Optional[float]) -> None:
+        session = _current_session.get()
+        if session is None:
+            return
+        self._write({
+            "type": "llm",
+            "session": session.id,
+            "offset_ms": session.offset_ms() - duration_ms,
+            "purpose": purpose,
+            "prompt": str(prompt) if self.record_prompts else None,
+            "response": response,
+            "duration_ms": duration_ms,
+            "ttft_ms": ttft_ms,
+        })
+
+    def record_tool(self, tool: str, tool_input: Any, result: Any, duration_ms: float,
+                    error: Optional[str] = None) -> None:
+        session = _current_session.get()
+        if session is None:
+            return
+        self._write({
+            "type": "tool",
+            "session": session.id,
+            "offset_ms": session.offset_ms() - duration_ms,
+            "tool": tool,
+            "input": tool_input,
+            "result": result,
+            "duration_ms": duration_ms,
+            "error": error,
+        })
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def get_session_recorder(path: str) -> SessionRecorder:
+    """
+    Returns the process-wide recorder for a path, so every agent in the process appends
+    through one writer (two writers would corrupt a gzip log). It is closed at exit.
+    """
+    path = os.path.abspath(path)
+    with _recorders_lock:
+        recorder = _recorders.get(path)
+        if recorder is None:
+            recorder = _recorders[path] = SessionRecorder(path)
+            atexit.register(recorder.close)
+        return recorder
+
+
+def load_sessions(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads a recording back as a list of sessions ordered by start time. Each session is
+    the session_start event with ``llm``, ``tools`` and ``end`` entries added.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    sessions: Dict[str, Dict[str, Any]] = {}
+    with opener(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = from_json(line)
+            if event["type"] == "session_start":
+                sessions[event["session"]] = {**event, "llm": [], "tools": [], "end": None}
+                continue
+            session = sessions.get(event["session"])
+            if session is None:
+                continue
+            if event["type"] == "llm":
+                session["llm"].append(event)
+            elif event["type"] == "tool":
+                session["tools"].append(event)
+            elif event["type"] == "session_end":
+                session["end"] = event
+    return sorted(sessions.values(), key=lambda session: session["time"])
@@ -0,0 +1,136 @@
+"""
+Rollup answers must match the base table's. Runs against the SQLite stand-in database
+from benchmarks/fake_db.py:
+
+    python -m pytest rollups_test.py
+"""
+import math
+import time
+
+import pytest
+
+from benchmarks.fake_db import FakeDatabase
+from tools.connection_pool import ConnectionPool
+from tools import rollups
+from tools.rollups import RollupManager, analyze_query
+
+QUERIES = [
+    "SELECT country, SUM(amount), COUNT(*) FROM Sale_Report GROUP BY country ORDER BY country",
+    "select country, sum( quantity ), avg(amount), min(amount), max(amount) from Sale_Report "
+    "where country in ('France', 'Spain') group by country order by country",
+    "SELECT country, SUM(amount) AS revenue FROM Sale_Report GROUP BY country HAVING COUNT(*) > 10 "
+    "ORDER BY revenue DESC",
+    "SELECT s.country, COUNT(amount) / COUNT(*) FROM Sale_Report s GROUP BY s.country ORDER BY s.country",
+    "SELECT SUM(amount), COUNT(*) FROM Sale_Report",
+]
+
+
+@pytest.fixture(autouse=True)
+def watermarks(monkeypatch):
+    monkeypatch.setattr(rollups, "rollup_watermarks", {"Sale_Report": "id"})
+
+
+@pytest.fixture
+def database(tmp_path):
+    return FakeDatabase(str(tmp_path / "rollups.sqlite3"), rows=2000)
+
+
+@pytest.fixture
+def manager(database):
+    return RollupManager(ConnectionPool(database.connect), path=":memory:")
+
+
+def run_base(database, query):
+    connection = database.connect()
+    try:
+        with connection.cursor(dictionary=True) as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+
+def assert_same_rows(expected, actual):
+    assert len(expected) == len(actual)
+    for expected_row, actual_row in zip(expected, actual):
+        assert list(expected_row) == list(actual_row)
+        for column, value in expected_row.items():
+            if isinstance(value, float):
+                assert math.isclose(value, actual_row[column], rel_tol=1e-9), column
+            else:
+                assert value == actual_row[column], column
+
+
+def build(manager, query):
+    manager._build(analyze_query(query).spec)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_rollup_answer_matches_base_table(database, manager, query):
+    build(manager, query)
+    assert manager.rollups, "rollup was not built"
+    assert_same_rows(run_base(database, query), manager.answer(query))
+
+
+def execute(database, statement):
+    connection = database.connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def wait_for_answer(manager, query, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        answer = manager.answer(query)
+        if answer is not None:
+            return answer
+        time.sleep(0.05)
+    return None
+
+
+def test_insert_is_never_served_stale(database, manager):
+    query = QUERIES[0]
+    build(manager, query)
+    assert_same_rows(run_base(database, query), manager.answer(query))
+    execute(
+        database,
+        "INSERT INTO Sale_Report (id, order_date, customer_id, product_id, country, quantity, amount) "
+        "VALUES (100001, '2024-01-01', 1, 1, 'Narnia', 2, 1000000), (100002, '2024-01-02', 1, 1, 'France', 1, 3.25)",
+    )
+    # The rollup is behind the base table: the base table answers while it catches up
+    assert manager.answer(query) is None
+    assert_same_rows(run_base(database, query), wait_for_answer(manager, query))
+
+
+def test_rollup_is_dropped_after_a_delete(database, manager):
+    query = QUERIES[0]
+    build(manager, query)
+    execute(database, "DELETE FROM Sale_Report WHERE id = 10")
+    assert manager.answer(query) is None
+    deadline = time.monotonic() + 10
+    while manager.rollups and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not manager.rollups
+    assert manager.answer(query) is None
+
+
+def test_tables_not_listed_get_no_rollup(monkeypatch):
+    monkeypatch.setattr(rollups, "rollup_watermarks", {})
+    assert analyze_query(QUERIES[0]) is None
+
+
+def test_point_lookup_on_watermark_builds_no_rollup(manager):
+    build(manager, "SELECT SUM(amount) FROM Sale_Report WHERE id = 5")
+    assert not manager.rollups
+    assert manager.answer("SELECT SUM(amount) FROM Sale_Report WHERE id = 5") is None
+
+
+def test_high_cardinality_dimensions_build_no_rollup(manager):
+    query = "SELECT customer_id, order_date, SUM(amount) FROM Sale_Report GROUP BY customer_id, order_date"
+    build(manager, query)
+    assert not manager.rollups
+    assert analyze_query(query).spec.name in manager.rejected
@@ -0,0 +1,70 @@
+"""
+Table selection by the schema tool's BM25 index. Run under pytest:
+
+    python -m pytest schema_index_test.py
+"""
+from tools.schema_index import SchemaIndex, tokenize
+
+
+def column(name, comment=""):
+    return {"name": name, "type": "varchar(255)", "comment": comment}
+
+
+TABLES = {
+    "Customer": {
+        "comment": "People who placed orders",
+        "columns": [column("id"), column("name"), column("email"), column("country")],
+        "foreign_keys": [],
+    },
+    "Product": {
+        "comment": "",
+        "columns": [column("id"), column("name"), column("category"), column("price")],
+        "foreign_keys": [],
+    },
+    "Sale_Report": {
+        "comment": "One row per order line",
+        "columns": [column("id"), column("order_date"), column("customer_id"), column("product_id"),
+                    column("amount", "Revenue in USD")],
+        "foreign_keys": [
+            {"column": "customer_id", "referenced_table": "Customer", "referenced_column": "id"},
+            {"column": "product_id", "referenced_table": "Product", "referenced_column": "id"},
+        ],
+    },
+    "Employee": {
+        "comment": "Staff directory",
+        "columns": [column("id"), column("name"), column("department"), column("salary")],
+        "foreign_keys": [],
+    },
+    "AuditLog": {
+        "comment": "",
+        "columns": [column("id"), column("event"), column("created_at")],
+        "foreign_keys": [],
+    },
+}
+
+
+def test_tokenize_splits_identifiers_and_strips_plurals():
+    assert tokenize("Sale_Report") == ["sale", "report"]
+    assert tokenize("AuditLog categories") == ["audit", "log", "category"]
+
+
+def test_search_ranks_direct_matches_first():
+    index = SchemaIndex(TABLES)
+    assert index.search("total sales revenue", top_k=1, max_neighbours=0) == ["Sale_Report"]
+    assert index.search("salary by department", top_k=1, max_neighbours=0) == ["Employee"]
+
+
+def test_search_adds_join_neighbours():
+    tables = SchemaIndex(TABLES).search("sales per product category", top_k=2)
+    assert tables[:2] == ["Product", "Sale_Report"] or tables[:2] == ["Sale_Report", "Product"]
+    assert "Customer" in tables
+    assert "Employee" not in tables and "AuditLog" not in tables
+
+
+def test_search_without_matches_is_empty():
+    assert SchemaIndex(TABLES).search("weather forecast") == []
+
+
+def test_schema_marks_foreign_keys():
+    schema = SchemaIndex(TABLES).schema(["Sale_Report"])
+    assert {"name": "customer_id", "type": "varchar(255)", "references": "Customer.id"} in schema["Sale_Report"]
@@ -0,0 +1,78 @@
+import base64
+import datetime
+import decimal
+from typing import Any
+
+import orjson
+
+# Decimals with more significant digits than a float can hold are kept as strings
+FLOAT_SAFE_DIGITS = 15
+# orjson only serializes integers in the int64/uint64 range; larger integral Decimals stay strings
+JSON_INT_MIN = -(2 ** 63)
+JSON_INT_MAX = 2 ** 64 - 1
+
+
+def _default(obj: Any) -> Any:
+    """Converts the database and Python types orjson does not handle natively."""
+    if isinstance(obj, decimal.Decimal):
+        if not obj.is_finite():
+            return str(obj)
+        if obj == obj.to_integral_value():
+            value = int(obj)
+            return value if JSON_INT_MIN <= value <= JSON_INT_MAX else str(obj)
+        if len(obj.as_tuple().digits) <= FLOAT_SAFE_DIGITS:
+            return float(obj)
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return base64.b64encode(data).decode("ascii")
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return str(obj)
+
+
+def compact(obj: Any) -> Any:
+    """
+    Rewrites lists of rows that share the same keys as a header plus value rows:
+    ``[{"a": 1, "b": 2}, {"a": 3, "b": 4}]`` becomes
+    ``{"columns": ["a", "b"], "rows": [[1, 2], [3, 4]]}``. Other values are walked recursively.
+    """
+    if isinstance(obj, dict):
+        return {key: compact(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        if obj and all(isinstance(row, dict) for row in obj):
+            columns = list(obj[0].keys())
+            if all(len(row) == len(columns) and all(column in row for column in columns) for row in obj):
+                return {"columns": columns, "rows": [[row[column] for column in columns] for row in obj]}
+        return [compact(value) for value in obj]
+    return obj
+
+
+def to_json_bytes(obj: Any, indent: bool = False) -> bytes:
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def to_json(obj: Any, indent: bool = False) -> str:
+    """Serializes tool results, stored entries and prompt payloads to a JSON string."""
+    return to_json_bytes(obj, indent=indent).decode()
+
+
+def to_prompt(obj: Any) -> str:
+    """Compact JSON for results that are placed in an LLM prompt."""
+    if isinstance(obj, str):
+        return obj
+    return to_json(compact(obj))
+
+
+def from_json(data: Any) -> Any:
+    return orjson.loads(data)
@@ -0,0 +1,24 @@
+"""
+Serialization of database values. Run under pytest:
+
+    python -m pytest serialization_test.py
+"""
+from decimal import Decimal
+
+from serialization import from_json, to_json
+
+
+def test_integral_decimals_within_int64_become_ints():
+    assert from_json(to_json([Decimal("42"), Decimal("-9223372036854775808"), Decimal("18446744073709551615")])) == [
+        42, -9223372036854775808, 18446744073709551615,
+    ]
+
+
+def test_integral_decimals_beyond_int64_become_strings():
+    big = Decimal("123456789012345678901234567890")
+    assert from_json(to_json({"total": big, "low": -big})) == {"total": str(big), "low": str(-big)}
+    assert from_json(to_json([Decimal("18446744073709551616")])) == ["18446744073709551616"]
+
+
+def test_fractional_decimals():
+    assert from_json(to_json([Decimal("1.25"), Decimal("1.2345678901234567890")])) == [1.25, "1.2345678901234567890"]
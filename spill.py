@@ -0,0 +1,128 @@
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+from serialization import compact, from_json, to_json, to_json_bytes
+
+spill_root = os.getenv("spill_root", os.path.join("media", "spill"))
+spill_threshold_bytes = int(os.getenv("spill_threshold_bytes", 256 * 1024))
+spill_preview_rows = int(os.getenv("spill_preview_rows", 5))
+spill_prompt_rows = int(os.getenv("spill_prompt_rows", 200))
+
+
+class SpilledResult:
+    """
+    Handle to a tool result that was written to an Arrow IPC file instead of being kept
+    in AgentState. Only the row count, column names and a short preview live in memory;
+    the rows are memory-mapped back on demand with load().
+    """
+
+    def __init__(self, path: str, num_rows: int, columns: List[str], nbytes: int, preview: List[Dict[str, Any]]):
+        self.path = path
+        self.num_rows = num_rows
+        self.columns = columns
+        self.nbytes = nbytes
+        self.preview = preview
+
+    def load(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Reads the rows back, zero-copy from the mapped file until converted to Python objects."""
+        import pyarrow as pa
+
+        with pa.memory_map(self.path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            if limit is not None:
+                table = table.slice(0, limit)
+            return table.to_pylist()
+
+    def for_prompt(self, limit: int = spill_prompt_rows) -> Dict[str, Any]:
+        """The first ``limit`` rows plus the total, for the response stage."""
+        return {"rows_total": self.num_rows, "rows_shown": min(limit, self.num_rows), "rows": self.load(limit)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The summary that stands in for the rows in messages and prompts."""
+        return {
+            "spilled_to": self.path,
+            "format": "arrow (read with pandas.read_feather or pyarrow.ipc.open_file)",
+            "rows": self.num_rows,
+            "columns": self.columns,
+            "preview": compact(self.preview),
+        }
+
+    def __repr__(self) -> str:
+        return f"SpilledResult(path={self.path!r}, num_rows={self.num_rows})"
+
+
+def _to_table(rows: List[Dict[str, Any]], encoded: bytes):
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pylist(rows)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    # Unsupported types in a column: fall back to the JSON-normalized rows, and turn
+    # columns that still mix types (int and str, differently shaped nested values) into text
+    rows = from_json(encoded)
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    arrays = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        try:
+            arrays[column] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays[column] = pa.array(
+                [None if value is None else value if isinstance(value, str) else to_json(value) for value in values],
+                pa.string(),
+            )
+    return pa.table(arrays)
+
+
+def maybe_spill(result: Any, directory: str, threshold: int = spill_threshold_bytes) -> Any:
+    """
+    Spills a row-list result to ``directory`` when its serialized size exceeds
+    ``threshold`` bytes and returns a SpilledResult; anything else is returned unchanged.
+    """
+    if not (isinstance(result, list) and result and all(isinstance(row, dict) for row in result)):
+        return result
+    encoded = to_json_bytes(result)
+    if len(encoded) <= threshold:
+        return result
+
+    import pyarrow as pa
+
+    try:
+        table = _to_table(result, encoded)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        # Losing a good result would be worse than keeping a large one in memory
+        print(f"Could not spill a {len(result)}-row result, keeping it in memory: {e}")
+        return result
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.abspath(os.path.join(directory, f"{uuid.uuid4().hex}.arrow"))
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return SpilledResult(
+        path=path,
+        num_rows=table.num_rows,
+        columns=table.column_names,
+        nbytes=len(encoded),
+        preview=result[:spill_preview_rows],
+    )
+
+
+def resolve_spilled(tool_input: Any, results: Dict[str, Any]) -> Any:
+    """
+    Replaces tool-input values that are exactly the path of a spilled result with that
+    result's rows (see SpilledResult.for_prompt), so tools
+    other than the sandbox get data rather than a file path. Other values, including
+    code that reads the file itself, are passed through unchanged.
+    """
+    spilled = {result.path: result for result in results.values() if isinstance(result, SpilledResult)}
+    if not spilled:
+        return tool_input
+    if isinstance(tool_input, str):
+        return spilled[tool_input].for_prompt() if tool_input in spilled else tool_input
+    if isinstance(tool_input, dict):
+        return {key: resolve_spilled(value, results) for key, value in tool_input.items()}
+    if isinstance(tool_input, list):
+        return [resolve_spilled(value, results) for value in tool_input]
+    return tool_input
@@ -0,0 +1,32 @@
+"""
+Spilling large step results to Arrow files. Run under pytest:
+
+    python -m pytest spill_test.py
+"""
+from decimal import Decimal
+
+from spill import SpilledResult, maybe_spill
+
+
+def test_small_results_stay_in_memory(tmp_path):
+    rows = [{"a": 1}]
+    assert maybe_spill(rows, str(tmp_path)) is rows
+
+
+def test_large_result_round_trips(tmp_path):
+    rows = [{"id": i, "amount": Decimal("1.50"), "country": "France"} for i in range(1000)]
+    spilled = maybe_spill(rows, str(tmp_path), threshold=1024)
+    assert isinstance(spilled, SpilledResult)
+    assert spilled.num_rows == 1000
+    assert spilled.load(2) == [{"id": 0, "amount": 1.5, "country": "France"}, {"id": 1, "amount": 1.5, "country": "France"}]
+
+
+def test_mixed_type_column_is_spilled_as_text(tmp_path):
+    rows = [{"id": i, "code": i if i % 2 else f"c{i}", "extra": [i] if i % 3 else {"k": i}} for i in range(500)]
+    spilled = maybe_spill(rows, str(tmp_path), threshold=1024)
+    assert isinstance(spilled, SpilledResult)
+    assert spilled.load(3) == [
+        {"id": 0, "code": "c0", "extra": '{"k":0}'},
+        {"id": 1, "code": "1", "extra": "[1]"},
+        {"id": 2, "code": "c2", "extra": "[2]"},
+    ]
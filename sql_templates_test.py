@@ -0,0 +1,80 @@
+"""
+Literal extraction for prepared statements. The placeholders bound here must not shift
+with sqlparse upgrades. Run under pytest:
+
+    python -m pytest sql_templates_test.py
+"""
+from decimal import Decimal
+
+import pytest
+
+from tools.sql_templates import fingerprint, parameterize
+
+
+def template_of(query):
+    template = parameterize(query)
+    return template.template, template.params
+
+
+def test_only_filter_and_limit_literals_become_parameters():
+    assert template_of(
+        "SELECT name, 1 FROM t WHERE id = 5 AND price > 1.50 ORDER BY 2 LIMIT 10 OFFSET 20"
+    ) == ("SELECT name, 1 FROM t WHERE id = %s AND price > %s ORDER BY 2 LIMIT %s OFFSET %s",
+          (5, Decimal("1.50"), 10, 20))
+    assert template_of("SELECT SUBSTR(name, 1, 3) FROM t WHERE id = 9") == (
+        "SELECT SUBSTR(name, 1, 3) FROM t WHERE id = %s", (9,))
+
+
+def test_having_and_join_conditions():
+    assert template_of("SELECT country, COUNT(*) FROM t GROUP BY country HAVING COUNT(*) > 3") == (
+        "SELECT country, COUNT(*) FROM t GROUP BY country HAVING COUNT(*) > %s", (3,))
+    assert template_of("SELECT * FROM a JOIN b ON a.id = b.id AND b.k = 7") == (
+        "SELECT * FROM a JOIN b ON a.id = b.id AND b.k = %s", (7,))
+
+
+def test_number_forms():
+    assert template_of("SELECT * FROM t WHERE v = 1e3 AND w = -4") == (
+        "SELECT * FROM t WHERE v = %s AND w = -%s", (1000.0, 4))
+
+
+def test_quoted_strings_are_unescaped():
+    assert template_of("SELECT * FROM t WHERE x = 'O''Brien'") == ("SELECT * FROM t WHERE x = %s", ("O'Brien",))
+
+
+def test_charset_introducers_keep_their_literal():
+    assert template_of("SELECT * FROM t WHERE name = _utf8mb4'abc' AND n = N'x'") == (
+        "SELECT * FROM t WHERE name = _utf8mb4'abc' AND n = N'x'", ())
+
+
+def test_typed_literals_keep_their_literal():
+    assert template_of(
+        "SELECT * FROM t WHERE d >= DATE '2024-01-01' AND ts < TIMESTAMP '2024-01-01 00:00:00' "
+        "AND e > NOW() - INTERVAL 3 DAY"
+    ) == ("SELECT * FROM t WHERE d >= DATE '2024-01-01' AND ts < TIMESTAMP '2024-01-01 00:00:00' "
+          "AND e > NOW() - INTERVAL %s DAY", (3,))
+
+
+def test_backslash_escapes_are_left_to_the_server():
+    assert template_of("SELECT * FROM t WHERE s = 'a\\'b'") == ("SELECT * FROM t WHERE s = 'a\\'b'", ())
+
+
+def test_percent_s_inside_literals():
+    # Extracted into a parameter it is harmless
+    assert template_of("SELECT * FROM t WHERE s LIKE '%s%'") == ("SELECT * FROM t WHERE s LIKE %s", ("%s%",))
+    # Left in the template the driver would take it for a placeholder
+    assert parameterize("SELECT 'a%s' FROM t WHERE id = 1") is None
+
+
+def test_comments_dropped_but_hints_kept():
+    assert template_of("SELECT /*+ MAX_EXECUTION_TIME(1000) */ * FROM t -- note\n WHERE id = 1;") == (
+        "SELECT /*+ MAX_EXECUTION_TIME(1000) */ * FROM t WHERE id = %s", (1,))
+
+
+@pytest.mark.parametrize("query", ["UPDATE t SET x = 1", "SELECT 1; SELECT 2", "DELETE FROM t WHERE id = 1"])
+def test_only_single_selects(query):
+    assert parameterize(query) is None
+
+
+def test_fingerprint_ignores_literals_and_whitespace():
+    assert fingerprint("SELECT * FROM t WHERE id = 1") == fingerprint("SELECT *  FROM t\n WHERE id = 2 -- x")
+    assert fingerprint("SELECT * FROM t WHERE id = 1") != fingerprint("SELECT * FROM u WHERE id = 1")
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from serialization import from_json, to_json
+
+artifact_root = os.getenv("artifact_root", os.path.join("media", "artifacts"))
+artifact_quota_mb = int(os.getenv("artifact_quota_mb", 512))
+
+# Files the sandbox and the pandasai path produce that are worth keeping
+ARTIFACT_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".svg", ".gif", ".pdf", ".html",
+    ".csv", ".parquet", ".arrow", ".json", ".xlsx",
+}
+
+HANDLE_PREFIX = "artifact://"
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Returns the sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_key(code_hash: str, data_hash: str = "") -> str:
+    """Key of a render: the same code over the same input data produces the same files."""
+    return hash_bytes(f"{code_hash}:{data_hash}".encode())
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated files (charts, CSVs, Parquet, ...).
+
+    Files are stored once under ``objects/<digest[:2]>/<digest><ext>`` and referred to by
+    stable handles of the form ``artifact://<digest><ext>``. A SQLite index records sizes
+    and last access times so the store can be kept under ``quota_bytes`` by evicting the
+    least recently used files, and maps render keys to the handles a render produced so
+    identical renders can be skipped.
+    """
+
+    def __init__(self, root: str = artifact_root, quota_bytes: int = artifact_quota_mb * 1024 * 1024):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.objects_path = os.path.join(root, "objects")
+        os.makedirs(self.objects_path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False, timeout=30)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                handle TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                name TEXT,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS artifacts_last_access ON artifacts (last_access);
+            CREATE TABLE IF NOT EXISTS renders (
+                render_key TEXT PRIMARY KEY,
+                handles TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            """
+        )
+        self._db.commit()
+
+    def _object_path(self, handle: str) -> str:
+        filename = handle[len(HANDLE_PREFIX):]
+        return os.path.join(self.objects_path, filename[:2], filename)
+
+    def put(self, path: str, name: Optional[str] = None) -> str:
+        """
+        Adds a file to the store, returning its handle. A file whose content is already
+        stored is not copied again; only its access time is refreshed.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        handle = f"{HANDLE_PREFIX}{hash_file(path)}{ext}"
+        target = self._object_path(handle)
+        now = time.time()
+
+        with self._lock:
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # Copy then rename so readers never see a half-written object
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+                os.close(fd)
+                shutil.copyfile(path, temp_path)
+                os.replace(temp_path, target)
+            self._db.execute(
+                "INSERT INTO artifacts (handle, size, name, created, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(handle) DO UPDATE SET last_access = excluded.last_access",
+                (handle, os.path.getsize(target), name or os.path.basename(path), now, now),
+            )
+            self._db.commit()
+            self._evict(keep={handle})
+        return handle
+
+    def collect(self, directory: str, extensions: Iterable[str] = ARTIFACT_EXTENSIONS) -> List[str]:
+        """Stores every file under ``directory`` with an artifact extension and returns their handles."""
+        extensions = set(extensions)
+        handles = []
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() in extensions:
+                    handles.append(self.put(os.path.join(dirpath, filename), name=filename))
+        return handles
+
+    def path(self, handle: str) -> Optional[str]:
+        """Resolves a handle to a file path, or None if it was evicted."""
+        target = self._object_path(handle)
+        if not os.path.exists(target):
+            return None
+        with self._lock:
+            self._db.execute("UPDATE artifacts SET last_access = ? WHERE handle = ?", (time.time(), handle))
+            self._db.commit()
+        return target
+
+    def name(self, handle: str) -> Optional[str]:
+        """Returns the original file name an artifact was stored under."""
+        row = self._db.execute("SELECT name FROM artifacts WHERE handle = ?", (handle,)).fetchone()
+        return row[0] if row else None
+
+    def lookup_render(self, key: str) -> Optional[List[str]]:
+        """Returns the handles of a previous render, if all of them are still in the store."""
+        row = self._db.execute("SELECT handles FROM renders WHERE render_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        handles = from_json(row[0])
+        if any(self.path(handle) is None for handle in handles):
+            with self._lock:
+                self._db.execute("DELETE FROM renders WHERE render_key = ?", (key,))
+                self._db.commit()
+            return None
+        return handles
+
+    def record_render(self, key: str, handles: List[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO renders (render_key, handles, created) VALUES (?, ?, ?)",
+                (key, to_json(handles), time.time()),
+            )
+            self._db.commit()
+
+    def total_size(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+
+    def _evict(self, keep=()) -> None:
+        """Deletes least recently used artifacts until the store fits its quota. Caller holds the lock."""
+        total = self.total_size()
+        if total <= self.quota_bytes:
+            return
+        rows = self._db.execute("SELECT handle, size FROM artifacts ORDER BY last_access").fetchall()
+        for handle, size in rows:
+            if total <= self.quota_bytes:
+                break
+            if handle in keep:
+                continue
+            try:
+                os.remove(self._object_path(handle))
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM artifacts WHERE handle = ?", (handle,))
+            total -= size
+        self._db.commit()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Returns the process-wide artifact store, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
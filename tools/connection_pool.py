@@ -0,0 +1,111 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Tuple
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    At most ``max_size`` connections are checked out at once; further callers wait.
+    Idle connections are reused (after a liveness check) until they have been idle for
+    ``max_idle_seconds``. Each connection is rolled back when returned so a pooled
+    connection never carries an open transaction, and with it a stale snapshot,
+    into the next query.
+
+    :param factory: Zero-argument callable opening a new connection.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_size: int = 4, max_idle_seconds: float = 300):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: List[Tuple[Any, float]] = []
+        # Connections checked out, and being opened by warm(); with the idle ones they
+        # make up every open connection, which warm() keeps within max_size
+        self._in_use = 0
+        self._opening = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @staticmethod
+    def _is_alive(connection: Any) -> bool:
+        is_connected = getattr(connection, "is_connected", None)
+        if is_connected is None:
+            return True
+        try:
+            return bool(is_connected())
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _take_idle(self) -> Any:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, idle_since = self._idle.pop()
+            if now - idle_since < self.max_idle_seconds and self._is_alive(connection):
+                return connection
+            self._close(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Checks a connection out for the duration of the block."""
+        self._slots.acquire()
+        with self._lock:
+            self._in_use += 1
+        connection = None
+        try:
+            connection = self._take_idle()
+            if connection is None:
+                connection = self.factory()
+            yield connection
+        finally:
+            if connection is not None:
+                # A failed query leaves the connection usable; a failed rollback does not
+                try:
+                    connection.rollback()
+                    with self._lock:
+                        self._idle.append((connection, time.monotonic()))
+                except Exception:
+                    self._close(connection)
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def warm(self, count: int = 1) -> int:
+        """
+        Opens connections until ``count`` are idle, so the next queries skip the connect,
+        without the open connections (checked out ones included) exceeding max_size.
+        Returns the idle count.
+        """
+        while True:
+            with self._lock:
+                idle = len(self._idle) + self._opening
+                if idle >= count or idle + self._in_use >= self.max_size:
+                    break
+                self._opening += 1
+            try:
+                connection = self.factory()
+            finally:
+                with self._lock:
+                    self._opening -= 1
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        with self._lock:
+            return len(self._idle)
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
@@ -0,0 +1,188 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from tracing import metrics, tracer
+
+# Memory budget shared by every cached DataFrame in the process
+dataframe_cache_mb = int(os.getenv("dataframe_cache_mb", 512))
+# Cached tables older than this are reloaded
+dataframe_cache_ttl = float(os.getenv("dataframe_cache_ttl", 600))
+# Text columns with fewer distinct values than this fraction of their rows become categoricals
+dataframe_category_ratio = float(os.getenv("dataframe_category_ratio", 0.5))
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z0-9_$]+$")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def optimize_dtypes(df):
+    """
+    Shrinks a freshly loaded DataFrame in place and returns it: DECIMAL columns become
+    floats, dates become datetimes, integers are narrowed to int32 where they fit, floats
+    to float32 only where no value changes, and repetitive text to categoricals.
+
+    Integers stay signed and at least 32 bits wide: generated code does arithmetic on
+    them, and numpy wraps around silently on overflow (uint8 quantity * 100, or - 5).
+    """
+    import numpy as np
+    import pandas as pd
+
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object or pd.api.types.is_string_dtype(series):
+            sample = series.dropna()
+            if sample.empty:
+                continue
+            first = sample.iloc[0]
+            if type(first).__name__ == "Decimal":
+                df[column] = series = pd.to_numeric(series.astype(float))
+            elif type(first).__name__ in ("date", "datetime"):
+                df[column] = pd.to_datetime(series)
+                continue
+            elif isinstance(first, str):
+                if sample.nunique() < len(series) * dataframe_category_ratio:
+                    df[column] = series.astype("category")
+                continue
+            else:
+                continue
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            info = np.iinfo(np.int32)
+            if series.dtype.itemsize > 4 and (series.empty or info.min <= series.min() and series.max() <= info.max):
+                df[column] = series.astype(np.int32)
+        elif pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            narrowed = series.astype(np.float32)
+            if np.array_equal(narrowed.astype(series.dtype).to_numpy(), series.to_numpy(), equal_nan=True):
+                df[column] = narrowed
+    return df
+
+
+def _copy_on_write() -> bool:
+    """Whether pandas copies shared column data before writing to it (always from pandas 3)."""
+    import pandas as pd
+
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except KeyError:
+        return False
+
+
+class CacheEntry:
+    def __init__(self, df, loaded_at: float):
+        self.df = df
+        self.nbytes = int(df.memory_usage(deep=True).sum())
+        self.loaded_at = loaded_at
+
+
+class DataFrameCache:
+    """
+    Process-wide LRU of DataFrames loaded from SQL, bounded by a memory budget.
+
+    Each key is loaded once, however many sessions ask for it at the same time, and stored
+    with optimize_dtypes applied. Callers get their own copy, so nothing a session does to
+    it (.loc assignments, inplace fillna) reaches the cached frame: a shallow copy where
+    pandas copy-on-write is on, a deep copy otherwise. Least recently used frames are
+    evicted to stay within the budget; a frame larger than the whole budget is returned
+    without being cached.
+    """
+
+    def __init__(self, budget_bytes: int = dataframe_cache_mb * 1024 * 1024, ttl: float = dataframe_cache_ttl):
+        self.budget_bytes = budget_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, CacheEntry]" = OrderedDict()
+        self._loading: Dict[Any, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def _lookup(self, key: Any) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key: Any, loader: Callable[[], Any]):
+        """Returns the cached frame for key, calling loader to build it on a miss."""
+        entry = self._lookup(key)
+        if entry is None:
+            with self._lock:
+                key_lock = self._loading.setdefault(key, threading.Lock())
+            try:
+                with key_lock:
+                    # Another session may have loaded it while this one waited
+                    entry = self._lookup(key)
+                    if entry is None:
+                        metrics.increment("dataframe_cache.misses")
+                        with tracer.span("dataframe_cache.load") as span:
+                            entry = CacheEntry(optimize_dtypes(loader()), time.monotonic())
+                            span.set(rows=len(entry.df), bytes=entry.nbytes)
+                        self._store(key, entry)
+            finally:
+                # Also after a failed load, so keys that never load leave nothing behind
+                with self._lock:
+                    self._loading.pop(key, None)
+        else:
+            metrics.increment("dataframe_cache.hits")
+        return entry.df.copy(deep=not _copy_on_write())
+
+    def _store(self, key: Any, entry: CacheEntry) -> None:
+        if entry.nbytes > self.budget_bytes:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            total = sum(cached.nbytes for cached in self._entries.values())
+            while total > self.budget_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                total -= evicted.nbytes
+                metrics.increment("dataframe_cache.evictions")
+
+    def invalidate(self, key: Any = None) -> None:
+        """Drops one key, or everything."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+def get_dataframe_cache() -> DataFrameCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DataFrameCache()
+        return _cache
+
+
+def load_table(table: str, connection_factory: Optional[Callable[[], Any]] = None):
+    """Returns a whole table as a cached DataFrame, read through the SQL tool's connection pool."""
+    if not _IDENTIFIER_RE.match(table):
+        raise ValueError(f"Invalid table name: {table!r}")
+
+    def load():
+        import pandas as pd
+        from .mysql_tool import get_connection_pool
+
+        with get_connection_pool(connection_factory).connection() as connection:
+            with connection.cursor(dictionary=True) as cursor:
+                cursor.execute(f"SELECT * FROM `{table}`")
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    return get_dataframe_cache().get((connection_factory, table), load)
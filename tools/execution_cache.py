@@ -0,0 +1,211 @@
+import ast
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from serialization import to_json_bytes
+from .artifact_store import get_artifact_store, hash_bytes, hash_file, render_key
+from .validate_code import normalize_code
+
+execution_cache_path = os.getenv("execution_cache_path", os.path.join("media", "execution_cache.db"))
+execution_cache_max_entries = int(os.getenv("execution_cache_max_entries", 1000))
+
+# String literals in the code ending in one of these are treated as input datasets
+DATA_EXTENSIONS = {
+    ".csv", ".tsv", ".parquet", ".arrow", ".feather", ".json", ".xlsx", ".xls", ".txt", ".npy", ".npz", ".pkl",
+}
+
+# Modules whose output changes between runs of the same code: randomness, the clock,
+# the network, databases, the environment and filesystem listings
+NONDETERMINISTIC_MODULES = {
+    "random", "secrets", "uuid", "time", "requests", "urllib", "urllib3", "httpx", "aiohttp", "socket",
+    "http", "ftplib", "smtplib", "subprocess", "glob", "sqlite3", "pymysql", "mysql", "psycopg2", "pyodbc",
+    "sqlalchemy", "pandasai",
+}
+NONDETERMINISTIC_CALLS = {
+    "now", "today", "utcnow", "random", "rand", "randn", "randint", "choice", "shuffle", "sample",
+    "read_sql", "read_sql_query", "read_sql_table", "read_gbq", "connect", "create_engine", "urlopen",
+    "getenv", "listdir", "scandir", "walk", "glob", "iglob", "rglob", "iterdir", "read_text", "read_bytes",
+    "exists", "isfile", "isdir", "getsize", "getmtime", "stat",
+}
+NONDETERMINISTIC_NAMES = {"environ"}
+# Calls that read the file named by their first argument; they are only cacheable when
+# that argument is a string literal naming a file that can be hashed
+FILE_READERS = {
+    "open", "read_csv", "read_table", "read_fwf", "read_parquet", "read_feather", "read_orc", "read_json",
+    "read_excel", "ExcelFile", "read_pickle", "read_hdf", "read_xml", "read_html", "read_stata", "read_sas",
+    "read_spss", "loadtxt", "genfromtxt", "fromfile", "imread", "np.load", "numpy.load", "joblib.load",
+}
+FILE_ARGUMENTS = {"file", "filepath_or_buffer", "path", "path_or_buf", "io", "fname", "filename"}
+URL_PREFIXES = ("http://", "https://", "ftp://", "s3://", "gs://", "gcs://", "az://", "abfs://", "hdfs://")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _call_name(func: ast.AST) -> str:
+    """Returns "open", "read_csv" or "np.load"-style names for the callee of a call."""
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        if isinstance(func.value, ast.Name) and f"{func.value.id}.{func.attr}" in FILE_READERS:
+            return f"{func.value.id}.{func.attr}"
+        return func.attr
+    return ""
+
+
+def _reads_file(call: ast.Call) -> bool:
+    """Whether a call reads a file. open() in a write-only mode does not."""
+    name = _call_name(call.func)
+    if name not in FILE_READERS:
+        return False
+    if name == "open":
+        mode = call.args[1] if len(call.args) > 1 else next(
+            (keyword.value for keyword in call.keywords if keyword.arg == "mode"), None
+        )
+        if isinstance(mode, ast.Constant) and isinstance(mode.value, str):
+            return "r" in mode.value or "+" in mode.value
+    return True
+
+
+def _file_argument(call: ast.Call) -> Optional[ast.AST]:
+    if call.args:
+        return call.args[0]
+    return next((keyword.value for keyword in call.keywords if keyword.arg in FILE_ARGUMENTS), None)
+
+
+def find_input_files(tree: ast.AST) -> Optional[List[str]]:
+    """
+    Returns the existing data files the code refers to by string literal, or None if the
+    code reads something that cannot be hashed: a URL, or a file named by anything but
+    a literal path. Relative paths that do not exist here refer to files the run writes
+    to its own fresh working directory.
+    """
+    paths = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and len(node.value) < 4096:
+            if node.value.lower().startswith(URL_PREFIXES):
+                return None
+            if os.path.splitext(node.value)[1].lower() in DATA_EXTENSIONS and os.path.isfile(node.value):
+                paths.add(os.path.abspath(node.value))
+        elif isinstance(node, ast.Call) and _reads_file(node):
+            argument = _file_argument(node)
+            if not (isinstance(argument, ast.Constant) and isinstance(argument.value, str)):
+                return None
+            path = argument.value
+            if os.path.isfile(path):
+                paths.add(os.path.abspath(path))
+            elif os.path.isabs(path) or path.startswith("~") or ".." in path.split(os.sep):
+                return None
+    return sorted(paths)
+
+
+def is_deterministic(tree: ast.AST) -> bool:
+    """
+    Best-effort check that the code does not depend on randomness, the clock, the
+    network, a database, the environment or a filesystem listing.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] in NONDETERMINISTIC_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if (node.module or "").split(".")[0] in NONDETERMINISTIC_MODULES:
+                return False
+        elif isinstance(node, ast.Attribute) and node.attr in NONDETERMINISTIC_CALLS | NONDETERMINISTIC_NAMES:
+            return False
+        elif isinstance(node, ast.Name) and node.id in NONDETERMINISTIC_NAMES:
+            return False
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in NONDETERMINISTIC_CALLS:
+            return False
+    return True
+
+
+def execution_key(code: str, limits: Optional[dict] = None) -> Optional[str]:
+    """
+    Cache key of a piece of code: its normalized AST, the content hashes of the input
+    files it reads and the sandbox limits it runs under. Returns None for code that is
+    invalid, non-deterministic, or reads inputs that cannot all be hashed.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    if not is_deterministic(tree):
+        return None
+    input_files = find_input_files(tree)
+    if input_files is None:
+        return None
+    data = {"files": [(path, hash_file(path)) for path in input_files], "limits": limits or {}}
+    return render_key(hash_bytes(normalize_code(code).encode()), hash_bytes(to_json_bytes(data)))
+
+
+class ExecutionCache:
+    """
+    Stores the stdout of successful sandbox runs by execution key, with LRU eviction
+    beyond ``max_entries``. The files a run produced are recorded as a render in the
+    artifact store, so a hit is only served while all of them are still stored.
+    """
+
+    def __init__(self, path: str = execution_cache_path, max_entries: int = execution_cache_max_entries):
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS executions (
+                key TEXT PRIMARY KEY,
+                stdout TEXT NOT NULL,
+                usage TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS executions_last_access ON executions (last_access);
+            """
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, List[str], str]]:
+        """Returns (stdout, artifact handles, original usage line) for a key, or None."""
+        row = self._db.execute("SELECT stdout, usage FROM executions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        handles = get_artifact_store().lookup_render(key)
+        with self._lock:
+            if handles is None:
+                self._db.execute("DELETE FROM executions WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute(
+                "UPDATE executions SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+        return row[0], handles, row[1]
+
+    def put(self, key: str, stdout: str, handles: List[str], usage: str) -> None:
+        get_artifact_store().record_render(key, handles)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO executions (key, stdout, usage, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, stdout, usage, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM executions WHERE key IN ("
+                "SELECT key FROM executions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+
+def get_execution_cache() -> ExecutionCache:
+    """Returns the process-wide execution cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExecutionCache()
+        return _cache
@@ -0,0 +1,196 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.tools import BaseTool
+from langchain_core.callbacks.manager import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+from langchain_core.runnables.config import run_in_executor
+from langchain_core.tools import ToolException
+from pydantic import BaseModel, Field
+
+from serialization import from_json, to_json_bytes
+from tracing import tracer
+from .connection_pool import ConnectionPool
+from .mysql_tool import validate_sql_query
+
+# Named data sources as JSON, e.g.
+# {"sales": {"engine": "MySQL", "host": "...", "port": 3306, "user": "...", "password": "...", "database": "sales"},
+#  "crm": {"engine": "PostgreSQL", "host": "...", "port": 5432, ...}}
+data_sources_config = os.getenv("data_sources", "")
+# Source queries run at once across all federated queries
+federation_max_workers = int(os.getenv("federation_max_workers", 8))
+
+_sources: Dict[str, "DataSource"] = {}
+_sources_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=federation_max_workers, thread_name_prefix="federation")
+
+
+@dataclass
+class DataSource:
+    """
+    A named database the federated tool can query, with its own connection pool.
+
+    :param engine: SQL engine (MySQL, PostgreSQL, or MsSQL), as in mysql_setup.get_db_connection.
+    :param factory: Zero-argument callable opening a connection; built from the other fields if not given.
+    """
+    name: str
+    engine: str = "MySQL"
+    host: Optional[str] = None
+    port: Optional[int] = None
+    user: Optional[str] = None
+    password: Optional[str] = None
+    database: Optional[str] = None
+    pool_size: int = 4
+    factory: Optional[Callable[[], Any]] = None
+
+    def __post_init__(self):
+        self.pool = ConnectionPool(self.factory or self.connect, max_size=self.pool_size)
+
+    def connect(self) -> Any:
+        """Opens a DB-API connection with the engine's driver."""
+        if self.engine == "MySQL":
+            import mysql.connector
+
+            return mysql.connector.connect(user=self.user, password=self.password, host=self.host,
+                                           port=self.port or 3306, database=self.database)
+        if self.engine == "PostgreSQL":
+            import psycopg2
+
+            return psycopg2.connect(user=self.user, password=self.password, host=self.host,
+                                    port=self.port or 5432, database=self.database)
+        if self.engine == "MsSQL":
+            import pyodbc
+
+            return pyodbc.connect(
+                f"DRIVER={{SQL Server}};SERVER={self.host},{self.port or 1433};"
+                f"DATABASE={self.database};UID={self.user};PWD={self.password}"
+            )
+        raise ValueError(f"Unsupported SQL engine: {self.engine}")
+
+
+def load_data_sources() -> Dict[str, DataSource]:
+    """Registers the sources configured in the data_sources env variable (once) and returns all sources."""
+    with _sources_lock:
+        if data_sources_config and not _sources:
+            for name, settings in from_json(data_sources_config).items():
+                _sources[name] = DataSource(name=name, **settings)
+        return dict(_sources)
+
+
+def register_data_source(source: DataSource) -> None:
+    """Adds or replaces a data source, e.g. one built around an existing connection factory."""
+    load_data_sources()
+    with _sources_lock:
+        previous = _sources.get(source.name)
+        _sources[source.name] = source
+    if previous is not None:
+        previous.pool.close_all()
+
+
+def _to_arrow(columns: List[str], rows: List[Any]):
+    import pyarrow as pa
+
+    if not rows:
+        return pa.table({column: pa.array([], pa.null()) for column in columns})
+    records = [dict(zip(columns, row)) for row in rows]
+    try:
+        return pa.Table.from_pylist(records)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Driver types Arrow cannot take directly: use the JSON-normalized values
+        return pa.Table.from_pylist(from_json(to_json_bytes(records)))
+
+
+def fetch_source(source: DataSource, query: str):
+    """Runs a query on a source's pool and returns the result as an Arrow table."""
+    with tracer.span("federation.source", source=source.name, engine=source.engine) as span:
+        with source.pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(query)
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        span.set(rows=len(rows))
+    return _to_arrow(columns, rows)
+
+
+class SourceQuery(BaseModel):
+    name: str = Field(description="Table name the result gets in the join query.")
+    source: str = Field(description="Data source to run the query on.")
+    query: str = Field(description="SQL in the source's dialect; filter and aggregate here, not in the join.")
+
+
+class FederatedSQLInput(BaseModel):
+    source_queries: List[SourceQuery] = Field(description="One query per data source involved, run concurrently.")
+    join_query: str = Field(description="DuckDB SQL combining the source results, referenced by their names.")
+
+
+class FederatedSQLTool(BaseTool):
+    name: str = "federated_sql"
+    description: str = (
+        "Answers questions spanning several databases. Each source query runs on its named data source "
+        "at the same time, pushing filters and aggregations down to that database; the join query then "
+        "combines their results locally with DuckDB SQL."
+    )
+    args_schema: type[BaseModel] = FederatedSQLInput
+    handle_tool_error: bool = True
+
+    def _run(
+        self, source_queries: List[Any], join_query: str, run_manager: Optional[CallbackManagerForToolRun] = None
+    ) -> List[Dict[str, Any]]:
+        """Fans the source queries out concurrently, then joins their results in DuckDB."""
+        import duckdb
+
+        sources = load_data_sources()
+        source_queries = [SourceQuery.model_validate(q) if isinstance(q, dict) else q for q in source_queries]
+        for source_query in source_queries:
+            if source_query.source not in sources:
+                raise ToolException(f"Unknown data source {source_query.source!r}; known: {sorted(sources)}")
+            if not validate_sql_query(source_query.query):
+                raise ToolException(f"Invalid SQL query for {source_query.name}")
+        if not validate_sql_query(join_query):
+            raise ToolException("Invalid join query")
+        names = [source_query.name for source_query in source_queries]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ToolException(f"Source query names must be unique; repeated: {duplicates}")
+
+        try:
+            with tracer.span("federation.fetch", sources=len(source_queries)):
+                # Each fetch runs in a copy of this context so its span joins the current trace
+                futures = {
+                    source_query.name: _executor.submit(
+                        contextvars.copy_context().run, fetch_source,
+                        sources[source_query.source], source_query.query,
+                    )
+                    for source_query in source_queries
+                }
+                tables = {name: future.result() for name, future in futures.items()}
+
+            with tracer.span("federation.join") as span:
+                # The join query is model-written: it may read the registered tables and
+                # nothing else, so no local files, COPY, ATTACH or extension installs
+                db = duckdb.connect(config={"enable_external_access": False})
+                try:
+                    for name, table in tables.items():
+                        db.register(name, table)
+                    cursor = db.execute(join_query)
+                    columns = [column[0] for column in cursor.description]
+                    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                finally:
+                    db.close()
+                span.set(rows=len(results))
+            return results
+        except Exception as e:
+            raise ToolException(f"Error executing federated query: {str(e)}")
+
+    async def _arun(
+        self, source_queries: List[Any], join_query: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> List[Dict[str, Any]]:
+        """Use the tool asynchronously by running the blocking drivers in an executor thread."""
+        return await run_in_executor(None, self._run, source_queries, join_query)
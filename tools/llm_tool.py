@@ -1,4 +1,4 @@
-from watson_llm import watsonx_llm
+from watson_llm import get_watsonx_llm
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import StructuredTool
 
@@ -10,7 +10,7 @@ class LLMQueryInput(BaseModel):
 def invoke_llm(query: str) -> str:
     """Query the LLM using watsonx_llm and return its response."""
     try:
-        response = watsonx_llm.invoke(query)
+        response = get_watsonx_llm().invoke(query)
         return response
     except Exception as e:
         return f"Error while querying LLM: {str(e)}"
@@ -1,13 +1,16 @@
 import json
 import os
+import threading
+import time
 
-import openai
-import psycopg2
-import psycopg2.extras
 import pymysql
 import pymysql.cursors
-from psycopg2 import OperationalError
+from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import  tool
+from langchain_core.tools import ToolException
+
+from tracing import tracer
+from .schema_index import SchemaIndex
 
 # db_name = None
 # db_user = None
@@ -21,6 +24,15 @@ db_password = os.getenv("db_password", "root")
 db_host = os.getenv("db_host")
 db_name = os.getenv("db_name")
 
+# Schema index cache, shared by every call to get_mysql_database_schema
+schema_cache_ttl = float(os.getenv("schema_cache_ttl", 300))
+schema_top_k = int(os.getenv("schema_top_k", 8))
+_schema_index = None
+_schema_index_built_at = 0.0
+_schema_index_lock = threading.Lock()
+# Approximate row counts from probe_row_counts, by table name
+_row_estimates = {}
+
 
 # This function accepts mySQL db credentials and an sql query and executes it
 def get_mysql_db_connection(db_user, db_password, db_host, db_port, db_name):
@@ -48,47 +60,163 @@ def get_mysql_db_connection(db_user, db_password, db_host, db_port, db_name):
         print(f"Failed to connect to the database: {e}")
         return None
 
-@tool
-def get_mysql_database_schema():
+class SchemaQueryInput(BaseModel):
+    question: str = Field(
+        default="",
+        description="The user's question. When given, only the tables relevant to it are returned.",
+    )
+    top_k: int = Field(default=schema_top_k, description="Maximum number of directly matching tables to return.")
+
+
+def load_schema_metadata(connection, database):
     """
-    Retrieves the schema (tables and columns with types) of the specified database using a connection established by get_db_connection.
+    Reads tables, columns, comments and foreign keys from information_schema in three
+    queries, instead of one SHOW COLUMNS round trip per table.
+
+    :return: Mapping of table name to its comment, columns and foreign keys, as expected by SchemaIndex.
     """
-    set_database_config(name=db_name, user=db_user, 
-                        password=db_password, host=db_host, port=db_port)
-    schema_info = {}
-    try:
+    tables = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_NAME AS table_name, TABLE_COMMENT AS table_comment "
+            "FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s",
+            (database,),
+        )
+        for row in cursor.fetchall():
+            tables[row["table_name"]] = {
+                "comment": row["table_comment"] or "",
+                "columns": [],
+                "foreign_keys": [],
+            }
+
+        cursor.execute(
+            "SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, "
+            "COLUMN_TYPE AS column_type, COLUMN_COMMENT AS column_comment "
+            "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s "
+            "ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            (database,),
+        )
+        for row in cursor.fetchall():
+            if row["table_name"] in tables:
+                tables[row["table_name"]]["columns"].append({
+                    "name": row["column_name"],
+                    "type": row["column_type"],
+                    "comment": row["column_comment"] or "",
+                })
+
+        cursor.execute(
+            "SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, "
+            "REFERENCED_TABLE_NAME AS referenced_table, REFERENCED_COLUMN_NAME AS referenced_column "
+            "FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL",
+            (database,),
+        )
+        for row in cursor.fetchall():
+            if row["table_name"] in tables:
+                tables[row["table_name"]]["foreign_keys"].append({
+                    "column": row["column_name"],
+                    "referenced_table": row["referenced_table"],
+                    "referenced_column": row["referenced_column"],
+                })
+    return tables
+
+
+def get_schema_index(refresh=False):
+    """
+    Returns the cached SchemaIndex for the configured database, rebuilding it when it is
+    older than schema_cache_ttl seconds or when refresh is True.
+
+    If the database cannot be reached or its metadata cannot be read, the previous
+    index is kept and returned, stale, with the failure logged.
+
+    :return: A SchemaIndex, or None if no index could ever be built.
+    """
+    global _schema_index, _schema_index_built_at
+
+    with _schema_index_lock:
+        fresh = time.monotonic() - _schema_index_built_at < schema_cache_ttl
+        if _schema_index is not None and fresh and not refresh:
+            return _schema_index
+
+        set_database_config(name=db_name, user=db_user,
+                            password=db_password, host=db_host, port=db_port)
         connection = get_mysql_db_connection(
             db_user, db_password, db_host, db_port, db_name
         )  # pass these as global variables
         if connection is None:
-            return None
+            if _schema_index is not None:
+                print("Could not reach the database; using the previous schema index")
+            return _schema_index
+        try:
+            tables = load_schema_metadata(connection, db_name)
+        except Exception as e:
+            print(f"Could not load the schema ({e}); using the previous schema index")
+            return _schema_index
+        finally:
+            connection.close()
+
+        _schema_index = SchemaIndex(tables)
+        _schema_index_built_at = time.monotonic()
+        return _schema_index
+
 
+def probe_row_counts(question, top_k=3):
+    """
+    Looks up the approximate row counts of the tables best matching a question, from
+    information_schema.TABLES (the storage engine's estimate, so no table is scanned).
+    The counts are kept and reported by get_mysql_database_schema for those tables.
+
+    :return: Mapping of table name to approximate row count.
+    """
+    index = get_schema_index()
+    if index is None:
+        return {}
+    table_names = index.search(question, top_k=top_k, max_neighbours=0)
+    if not table_names:
+        return {}
+    connection = get_mysql_db_connection(db_user, db_password, db_host, db_port, db_name)
+    if connection is None:
+        return {}
+    try:
         with connection.cursor() as cursor:
-            # Fetching all table names in the database
-            tables_query = "SHOW TABLES"
-            cursor.execute(tables_query)
-            tables = cursor.fetchall()
-
-            for table in tables:
-                # The key for table names in the result might vary, so adjust as needed
-                table_name = list(table.values())[0]
-                schema_info[table_name] = []
-
-                # Fetching all column names and types for a table
-                columns_query = f"SHOW COLUMNS FROM {table_name}"
-                cursor.execute(columns_query)
-                columns = cursor.fetchall()
-
-                for column in columns:
-                    column_info = {"name": column["Field"], "type": column["Type"]}
-                    schema_info[table_name].append(column_info)
-    except Exception as e:
-        print(f"An error occurred: {e}")
+            cursor.execute(
+                "SELECT TABLE_NAME AS table_name, TABLE_ROWS AS table_rows FROM information_schema.TABLES "
+                f"WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({', '.join(['%s'] * len(table_names))})",
+                (db_name, *table_names),
+            )
+            counts = {row["table_name"]: row["table_rows"] for row in cursor.fetchall()
+                      if row["table_rows"] is not None}
     finally:
-        if "connection" in locals() and connection:
-            connection.close()
+        connection.close()
+    _row_estimates.update(counts)
+    return counts
+
 
-    return schema_info
+@tool("get_mysql_database_schema", args_schema=SchemaQueryInput)
+def get_mysql_database_schema(question: str = "", top_k: int = schema_top_k):
+    """
+    Retrieves the schema (tables and columns with types) of the database, as
+    {"tables": {table: columns}, "approx_row_counts": {table: rows}}. Pass the user's
+    question to get only the tables relevant to it, plus the tables they join to; row
+    counts are listed for the tables whose count is known.
+    """
+    with tracer.span("schema.index"):
+        index = get_schema_index()
+    if index is None:
+        raise ToolException("Could not load the database schema")
+    if not question.strip():
+        table_names = list(index.tables)
+    else:
+        with tracer.span("schema.search", tables=len(index)):
+            table_names = index.search(question, top_k=top_k)
+    if not table_names:
+        # Nothing matched: list every table name without columns so the caller
+        # can ask again with better terms without receiving the whole schema.
+        return {"tables": {table_name: [] for table_name in sorted(index.tables)}, "approx_row_counts": {}}
+    return {
+        "tables": index.schema(table_names),
+        "approx_row_counts": {name: _row_estimates[name] for name in table_names if name in _row_estimates},
+    }
 
 
 def set_database_config(name, user, password, host, port):
@@ -2,20 +2,54 @@ from pydantic import BaseModel, Field
 from langchain.tools import BaseTool, StructuredTool
 from langchain_core.tools import ToolException
 from  langchain_core.callbacks.manager import CallbackManagerForToolRun,AsyncCallbackManagerForToolRun
+from langchain_core.runnables.config import run_in_executor
 import sqlparse
-import mysql.connector
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 import os
+import threading
+import time
+from contextlib import ExitStack
+from tracing import tracer
+from .connection_pool import ConnectionPool
 from .mysql_setup import set_database_config
-from dotenv import load_dotenv
-load_dotenv()
+from .rollups import get_rollup_manager
+from .sql_templates import get_statement_cache, parameterize
+from .workload import get_workload_recorder, workload_enabled
 
 
 db_port = 3306
-db_user = os.getenv("db_user")
-db_password = os.getenv("db_password")
-db_host = os.getenv("db_host")
-db_name = os.getenv("db_name")
+db_user = None
+db_password = None
+db_host = None
+db_name = None
+_db_config_loaded = False
+# Connections kept open per pool between queries
+db_pool_size = int(os.getenv("db_pool_size", "4"))
+_pools: Dict[Any, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+# Run SELECTs as server-side prepared statements with their literals bound as parameters
+sql_prepared_statements = os.getenv("sql_prepared_statements", "1") != "0"
+# Server errors after which a prepared statement is retried as plain SQL: statement not
+# preparable, bad parameter, placeholder in a position MySQL rejects, needs re-preparing
+PREPARED_FALLBACK_ERRNOS = {1064, 1055, 1210, 1295, 1615}
+# Answer frequent aggregate queries from local rollups of the append-only tables listed
+# in rollup_watermarks (see rollups.py)
+sql_rollups = os.getenv("sql_rollups", "0") == "1"
+
+
+def load_db_config():
+    """Reads the connection settings from the environment and .env on first use rather than at import."""
+    global db_user, db_password, db_host, db_name, _db_config_loaded
+    if _db_config_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    db_user = os.getenv("db_user")
+    db_password = os.getenv("db_password")
+    db_host = os.getenv("db_host")
+    db_name = os.getenv("db_name")
+    _db_config_loaded = True
 
 
 # Schema for SQL execution
@@ -29,6 +63,7 @@ class SQLValidatorInput(BaseModel):
 def get_mysql_db_connection(db_user: str, db_password: str, db_host: str, 
                           db_port: int, db_name: str):
     """Create and return a MySQL database connection."""
+    import mysql.connector
 
     set_database_config(name=db_name, user=db_user, 
                         password=db_password, host=db_host, port=db_port)
@@ -68,11 +103,30 @@ def validate_sql_query(query: str) -> bool:
     except Exception as e:
         return False
 
+def open_default_connection():
+    """Opens a connection to the env-configured MySQL server."""
+    load_db_config()
+    return get_mysql_db_connection(db_user, db_password, db_host, db_port, db_name)
+
+
+def get_connection_pool(factory: Optional[Callable[[], Any]] = None) -> ConnectionPool:
+    """Returns the process-wide pool for a connection factory (the env-configured server by default)."""
+    factory = factory or open_default_connection
+    with _pools_lock:
+        pool = _pools.get(factory)
+        if pool is None:
+            pool = _pools[factory] = ConnectionPool(factory, max_size=db_pool_size)
+        return pool
+
+
 class SQLExecutorTool(BaseTool):
     name: str = "sql_executor"  # Add the type annotation
     description: str = "Execute SQL queries on a MySQL database"  # Add the type annotation
     args_schema: type[BaseModel] = SQLExecutorInput
     handle_tool_error: bool = True  # Add the type annotation
+    # Optional zero-argument callable returning a DB-API connection, used instead
+    # of the env-configured MySQL server (e.g. by the offline benchmarks)
+    connection_factory: Optional[Callable[[], Any]] = None
 
     def _run(
         self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None
@@ -83,27 +137,75 @@ class SQLExecutorTool(BaseTool):
             if not validate_sql_query(query):
                 raise ToolException("Invalid SQL query")
 
-            connection = get_mysql_db_connection(
-                db_user, db_password, db_host, db_port, db_name
-            )
-            print(f"connection.....")
+            pool = get_connection_pool(self.connection_factory)
+            rollups = get_rollup_manager(pool) if sql_rollups else None
+            if rollups is not None:
+                results = rollups.answer(query)
+                if results is not None:
+                    return results
+
+            started = time.perf_counter()
             try:
-                with connection.cursor(dictionary=True) as cursor:
+                results = self._execute(pool, query)
+            except Exception as e:
+                if workload_enabled:
+                    latency_ms = (time.perf_counter() - started) * 1000
+                    get_workload_recorder().record(query, latency_ms, None, error=str(e))
+                raise
+            if workload_enabled:
+                latency_ms = (time.perf_counter() - started) * 1000
+                get_workload_recorder().record(query, latency_ms, len(results), pool=pool)
+            if rollups is not None:
+                rollups.observe(query)
+            return results
+
+        except Exception as e:
+            raise ToolException(f"Error executing query: {str(e)}")
+
+    def _execute(self, pool, query: str) -> List[Dict[str, Any]]:
+        """Runs the query on a pooled connection, as a prepared statement when it can be templated."""
+        template = parameterize(query) if sql_prepared_statements else None
+        with ExitStack() as stack:
+            with tracer.span("sql.connect"):
+                connection = stack.enter_context(pool.connection())
+            if template is not None:
+                results = self._run_prepared(connection, template)
+                if results is not None:
+                    return results
+            with connection.cursor(dictionary=True) as cursor:
+                with tracer.span("sql.execute"):
                     cursor.execute(query)
+                with tracer.span("sql.fetch") as span:
                     results = cursor.fetchall()
-                    return results
-            finally:
-                if connection:
-                    connection.close()
-                    
+                    span.set(rows=len(results))
+                return results
+
+    def _run_prepared(self, connection, template) -> Optional[List[Dict[str, Any]]]:
+        """
+        Executes a templated query through the connection's cached prepared statement.
+        Returns None if the server rejected the statement in prepared form, so the caller
+        runs the original SQL instead.
+        """
+        statements = get_statement_cache()
+        cursor, operation, reused = statements.cursor_for(connection, template)
+        try:
+            with tracer.span("sql.execute", fingerprint=template.fingerprint[:12], prepared=reused):
+                cursor.execute(operation, template.params)
+            with tracer.span("sql.fetch") as span:
+                results = cursor.fetchall()
+                span.set(rows=len(results))
+            return results
         except Exception as e:
-            raise ToolException(f"Error executing query: {str(e)}")
+            statements.discard(connection, template.fingerprint)
+            if getattr(e, "errno", None) in PREPARED_FALLBACK_ERRNOS:
+                return None
+            raise
 
     async def _arun(
         self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
-        """Use the tool asynchronously."""
-        raise NotImplementedError("SQL executor does not support async")
+        """Use the tool asynchronously by running the blocking driver in an executor thread."""
+        return await run_in_executor(None, self._run, query)
 
 def sql_validator(query: str) -> str:
     """Validate the provided SQL query."""
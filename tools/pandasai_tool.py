@@ -0,0 +1,62 @@
+import os
+import tempfile
+from typing import List
+
+from langchain.pydantic_v1 import BaseModel, Field
+from langchain.tools import tool
+from langchain_core.tools import ToolException
+
+from serialization import to_prompt
+from tracing import tracer
+from .artifact_store import get_artifact_store
+from .dataframe_cache import load_table
+
+# Conversation turns the pandasai agent keeps while answering one question
+pandasai_memory_size = int(os.getenv("pandasai_memory_size", 10))
+# Rows of a DataFrame answer returned to the agent
+pandasai_max_rows = int(os.getenv("pandasai_max_rows", 200))
+
+
+class PandasAIInput(BaseModel):
+    question: str = Field(description="The analysis question, in plain language.")
+    tables: List[str] = Field(description="Database tables the question needs.")
+
+
+@tool("pandasai_analysis", args_schema=PandasAIInput)
+def analyze_with_pandasai(question: str, tables: List[str]) -> str:
+    """
+    Answers an analysis question over whole database tables with pandasai, which writes and runs
+    the pandas code itself. Tables come from a shared in-memory cache, so repeated questions over the
+    same tables do not reload them. Charts are returned as artifact handles.
+    """
+    from pandasai import Agent
+    from watson_llm import get_pandasai_llm
+
+    try:
+        with tracer.span("pandasai.load", tables=len(tables)):
+            frames = [load_table(table) for table in tables]
+    except Exception as e:
+        raise ToolException(f"Error loading tables: {str(e)}")
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="pandasai-") as charts_path:
+            agent = Agent(frames, config={
+                "llm": get_pandasai_llm(),
+                "save_charts": True,
+                "save_charts_path": charts_path,
+            }, memory_size=pandasai_memory_size)
+            with tracer.span("pandasai.chat"):
+                response = agent.chat(question)
+            handles = get_artifact_store().collect(charts_path)
+    except Exception as e:
+        raise ToolException(f"Error running the analysis: {str(e)}")
+
+    if hasattr(response, "to_frame"):
+        # A Series answer: records need a DataFrame
+        response = response.to_frame()
+    if hasattr(response, "to_dict"):
+        response = response.head(pandasai_max_rows).to_dict(orient="records")
+    store = get_artifact_store()
+    lines = [to_prompt(response)]
+    lines += [f"[artifact] {store.name(handle)} -> {handle}" for handle in handles]
+    return "\n".join(lines)
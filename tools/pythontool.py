@@ -1,18 +1,80 @@
 import ast
+import atexit
 import os
+import signal
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 import venv
+from dataclasses import asdict, dataclass
 from io import StringIO
+from typing import Optional
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import tool
 from langchain_core.tools import ToolException
 
+from tracing import tracer
+from .artifact_store import get_artifact_store
+from .execution_cache import execution_key, get_execution_cache
+
 # Global variables
 env_path = 'venvs'
 media_path = None
 python_executable = None
+# Interpreter to run sandboxed code with instead of the managed venv, if set
+sandbox_python = os.getenv("sandbox_python")
+
+# Sandbox limits. A call may lower them through the tool arguments but never raise them
+sandbox_timeout_seconds = float(os.getenv("sandbox_timeout_seconds", 60))
+sandbox_cpu_seconds = int(os.getenv("sandbox_cpu_seconds", 30))
+sandbox_memory_mb = int(os.getenv("sandbox_memory_mb", 2048))
+sandbox_file_size_mb = int(os.getenv("sandbox_file_size_mb", 100))
+sandbox_max_output_bytes = int(os.getenv("sandbox_max_output_bytes", 64 * 1024))
+# Modules a pre-started worker imports while it waits for a script
+sandbox_preload_modules = [
+    name for name in os.getenv("sandbox_preload_modules", "numpy,pandas,matplotlib.pyplot").split(",") if name
+]
+# Pre-started workers older than this are replaced rather than used
+sandbox_worker_max_age_seconds = float(os.getenv("sandbox_worker_max_age_seconds", 300))
+
+# Run by a pre-started worker: import the heavy modules, then wait on stdin for the
+# working directory and script to run. Closing stdin without a script exits it.
+WORKER_BOOTSTRAP = """
+import importlib, os, runpy, sys
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+cwd = sys.stdin.readline().rstrip("\\n")
+path = sys.stdin.readline().rstrip("\\n")
+if not path:
+    sys.exit(0)
+os.chdir(cwd)
+sys.argv = [path]
+sys.path[0] = os.path.dirname(path)
+runpy.run_path(path, run_name="__main__")
+"""
+
+# Wraps every sandbox interpreter: applies the rlimits given as the first three arguments
+# to itself, then execs the real interpreter command line, which inherits them. Doing this
+# in the child replaces preexec_fn, which is unsafe to use while other threads are running.
+LIMITS_BOOTSTRAP = """
+import os, resource, sys
+cpu_seconds, memory_mb, file_size_mb = (int(value) for value in sys.argv[1:4])
+if cpu_seconds:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+if memory_mb:
+    resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 1024 * 1024,) * 2)
+if file_size_mb:
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_size_mb * 1024 * 1024,) * 2)
+os.execv(sys.executable, [sys.executable, *sys.argv[4:]])
+"""
+
+_warm_worker = None
+_warm_worker_lock = threading.Lock()
 
 def initialize_environment(env_path_param):
     global env_path, media_path, python_executable
@@ -22,6 +84,10 @@ def initialize_environment(env_path_param):
 
 def ensure_virtual_environment():
     global python_executable
+    if sandbox_python:
+        python_executable = sandbox_python
+        return
+
     # Check if the virtual environment already exists
     env_exists = os.path.exists(env_path)
 
@@ -29,7 +95,7 @@ def ensure_virtual_environment():
         venv.create(env_path, with_pip=True)
 
     # Set the Python executable path
-    python_executable = os.path.join(env_path, "bin", "python")
+    python_executable = os.path.abspath(os.path.join(env_path, "bin", "python"))
 
     # Install defaults only if the environment was newly created
     if not env_exists:
@@ -37,7 +103,8 @@ def ensure_virtual_environment():
 
 
 def install_defaults():
-    defaults = ["matplotlib", "scikit-learn", "numpy", "statsmodels", "pandas", "scipy"]
+    # pyarrow reads the Arrow files large step results are spilled to (see spill.py)
+    defaults = ["matplotlib", "scikit-learn", "numpy", "statsmodels", "pandas", "scipy", "pyarrow"]
     safe_install_modules(defaults)
 
 
@@ -54,40 +121,292 @@ def install_dependencies(dependencies):
         subprocess.call([python_executable, "-m", "pip", "install", dependency])
 
 
+@dataclass
+class SandboxLimits:
+    """
+    Resource limits applied to one sandboxed execution. A value of 0 disables that limit;
+    only the env configuration can do that, see limits_for_call.
+    """
+    timeout_seconds: float = sandbox_timeout_seconds
+    cpu_seconds: int = sandbox_cpu_seconds
+    memory_mb: int = sandbox_memory_mb
+    file_size_mb: int = sandbox_file_size_mb
+    max_output_bytes: int = sandbox_max_output_bytes
+
+
+def limits_for_call(**overrides) -> SandboxLimits:
+    """
+    Builds the limits for one call from the per-call overrides in the tool arguments.
+    Overrides must be positive and are clamped to the configured limits, so a call can
+    tighten a limit but never raise or disable it.
+    """
+    limits = SandboxLimits()
+    for name, value in overrides.items():
+        if value is None:
+            continue
+        if value <= 0:
+            raise ToolException(f"{name} must be greater than 0")
+        ceiling = getattr(limits, name)
+        setattr(limits, name, min(value, ceiling) if ceiling else value)
+    return limits
+
+
+@dataclass
+class SandboxResult:
+    """Outcome and resource usage of one sandboxed execution."""
+    returncode: int
+    stdout: str
+    stderr: str
+    wall_seconds: float
+    cpu_seconds: float
+    max_rss_mb: float
+    timed_out: bool = False
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+
+    def usage_summary(self) -> str:
+        summary = (
+            f"[usage] wall={self.wall_seconds:.2f}s cpu={self.cpu_seconds:.2f}s "
+            f"max_rss={self.max_rss_mb:.1f}MB exit={self.returncode}"
+        )
+        if self.timed_out:
+            summary += " timed_out=true"
+        if self.stdout_truncated or self.stderr_truncated:
+            summary += " output_truncated=true"
+        return summary
+
+
+def _drain(stream, cap, sink):
+    """
+    Reads a pipe to EOF keeping only the first cap bytes. The rest is read and
+    discarded so a chatty child never blocks on a full pipe.
+    """
+    kept = bytearray()
+    total = 0
+    for chunk in iter(lambda: stream.read(8192), b""):
+        total += len(chunk)
+        if len(kept) < cap:
+            kept += chunk[:cap - len(kept)]
+    stream.close()
+    sink["data"] = kept.decode(errors="replace")
+    sink["truncated"] = total > cap
+
+
+def _kill_process_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _spawn(args, limits, cwd=None, stdin=subprocess.DEVNULL):
+    # The child runs in its own session so that on timeout, and after a normal exit,
+    # the whole process group (including anything the script spawned) can be killed.
+    # LIMITS_BOOTSTRAP applies the rlimits, then execs into the same pid.
+    rlimits = [str(int(value)) for value in _rlimits(limits)]
+    return subprocess.Popen(
+        [python_executable, "-c", LIMITS_BOOTSTRAP, *rlimits, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=stdin,
+        cwd=cwd,
+        start_new_session=True,
+    )
+
+
+def _rlimits(limits):
+    return limits.cpu_seconds, limits.memory_mb, limits.file_size_mb
+
+
+def prestart_worker(limits=None):
+    """
+    Starts a sandbox interpreter ahead of time with the preload modules imported, so the
+    next run_sandboxed call with the same rlimits skips interpreter start-up and the heavy
+    imports. Keeps at most one worker; a call while a fresh matching one waits is a no-op.
+    """
+    global _warm_worker
+    limits = limits or SandboxLimits()
+    if python_executable is None:
+        ensure_virtual_environment()
+    with _warm_worker_lock:
+        if _warm_worker is not None:
+            process, worker_rlimits, started = _warm_worker
+            if (worker_rlimits == _rlimits(limits) and process.poll() is None
+                    and time.monotonic() - started < sandbox_worker_max_age_seconds):
+                return
+            _kill_process_group(process.pid)
+        process = _spawn(["-c", WORKER_BOOTSTRAP, *sandbox_preload_modules], limits, stdin=subprocess.PIPE)
+        _warm_worker = (process, _rlimits(limits), time.monotonic())
+
+
+def _take_worker(limits):
+    """Hands out the pre-started worker if it runs under these rlimits and is still usable."""
+    global _warm_worker
+    with _warm_worker_lock:
+        if _warm_worker is None:
+            return None
+        process, worker_rlimits, started = _warm_worker
+        if worker_rlimits != _rlimits(limits):
+            return None
+        _warm_worker = None
+    if process.poll() is None and time.monotonic() - started < sandbox_worker_max_age_seconds:
+        return process
+    _kill_process_group(process.pid)
+    return None
+
+
+@atexit.register
+def _stop_worker():
+    if _warm_worker is not None:
+        _kill_process_group(_warm_worker[0].pid)
+
+
+def run_sandboxed(script_path, limits=None, cwd=None):
+    """
+    Runs a script with the sandbox interpreter under the given limits, on the
+    pre-started worker (see prestart_worker) if one matches, else on a new interpreter.
+
+    On a worker the CPU time and peak memory reported include its preloading, and the
+    wall-clock timeout starts when the script is handed over.
+    """
+    limits = limits or SandboxLimits()
+    cap = limits.max_output_bytes or sys.maxsize
+    process = _take_worker(limits)
+    if process is not None:
+        try:
+            process.stdin.write(f"{cwd or os.path.dirname(script_path)}\n{script_path}\n".encode())
+            process.stdin.close()
+        except OSError:
+            _kill_process_group(process.pid)
+            process = None
+    if process is None:
+        process = _spawn([script_path], limits, cwd=cwd)
+    started = time.monotonic()
+    stdout, stderr = {}, {}
+    readers = [
+        threading.Thread(target=_drain, args=(process.stdout, cap, stdout), daemon=True),
+        threading.Thread(target=_drain, args=(process.stderr, cap, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    # Poll with wait4 rather than Popen.wait so the child's rusage is available
+    timed_out = False
+    deadline = started + limits.timeout_seconds if limits.timeout_seconds else None
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            timed_out = True
+            _kill_process_group(process.pid)
+            pid, status, usage = os.wait4(process.pid, 0)
+            break
+        time.sleep(0.01)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall_seconds = time.monotonic() - started
+
+    _kill_process_group(process.pid)
+    for reader in readers:
+        reader.join(timeout=1)
+
+    return SandboxResult(
+        returncode=process.returncode,
+        stdout=stdout.get("data", ""),
+        stderr=stderr.get("data", ""),
+        wall_seconds=wall_seconds,
+        cpu_seconds=usage.ru_utime + usage.ru_stime,
+        max_rss_mb=usage.ru_maxrss / 1024,
+        timed_out=timed_out,
+        stdout_truncated=stdout.get("truncated", False),
+        stderr_truncated=stderr.get("truncated", False),
+    )
+
+
 # Argument Schema
 class PythonExecutorInput(BaseModel):
     code: str = Field(description="The Python code to be executed.")
+    timeout_seconds: Optional[float] = Field(default=None, description="Lower wall-clock limit for this run, in seconds.")
+    cpu_seconds: Optional[int] = Field(default=None, description="Lower CPU time limit for this run, in seconds.")
+    memory_mb: Optional[int] = Field(default=None, description="Lower address-space limit in MB.")
+    file_size_mb: Optional[int] = Field(default=None, description="Lower limit on the largest file the code may write, in MB.")
+    max_output_bytes: Optional[int] = Field(default=None, description="Fewer bytes of stdout/stderr to keep.")
+    use_cache: bool = Field(
+        default=True,
+        description="Reuse the output of an identical earlier run. Set to false for non-deterministic code.",
+    )
 
 
 @tool("python_executor", args_schema=PythonExecutorInput)
-def execute_python_code(code: str) -> str:
+def execute_python_code(
+    code: str,
+    timeout_seconds: Optional[float] = None,
+    cpu_seconds: Optional[int] = None,
+    memory_mb: Optional[int] = None,
+    file_size_mb: Optional[int] = None,
+    max_output_bytes: Optional[int] = None,
+    use_cache: bool = True,
+) -> str:
     """
-    Execute valid Python code in a controlled virtual environment.
+    Execute valid Python code in a controlled virtual environment with time, memory and output limits.
+    Files the code writes to its working directory (charts, CSVs, Parquet) are returned as artifact handles.
+    Identical code over unchanged input files, under the same limits, returns the stored output of the
+    earlier run; code reading a database, URL or directory listing always runs.
     """
+    limits = limits_for_call(
+        timeout_seconds=timeout_seconds,
+        cpu_seconds=cpu_seconds,
+        memory_mb=memory_mb,
+        file_size_mb=file_size_mb,
+        max_output_bytes=max_output_bytes,
+    )
+    with tracer.span("sandbox.cache_lookup") as span:
+        key = execution_key(code, asdict(limits)) if use_cache else None
+        cached = get_execution_cache().get(key) if key is not None else None
+        span.set(hit=cached is not None)
+    if cached is not None:
+        stdout, handles, usage = cached
+        return format_result(stdout, handles, f"{usage} cached=true")
+
     try:
         # Initialize environment
         ensure_virtual_environment()
     except Exception as e:
         print('Couldnt create a sandbox envronment')
-    try:
-        # Create a temporary file to hold the Python script
-        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_file:
-            temp_file.write(code.encode())
-            temp_filename = temp_file.name
-
-        # Execute the script in the virtual environment
-        result = subprocess.run(
-            [python_executable, temp_filename],
-            capture_output=True,
-            text=True
-        )
 
-        # Cleanup the temporary file
-        os.remove(temp_filename)
+    try:
+        # Each run gets its own working directory; whatever the script writes
+        # there is saved to the artifact store
+        with tempfile.TemporaryDirectory(prefix="sandbox-") as workdir:
+            script_path = os.path.join(workdir, "main.py")
+            with open(script_path, "w") as script:
+                script.write(code)
 
-        if result.returncode == 0:
-            return result.stdout
-        else:
-            raise ToolException(f"Error executing code: {result.stderr}")
+            # Execute the script in the virtual environment
+            with tracer.span("sandbox.run") as span:
+                result = run_sandboxed(script_path, limits, cwd=workdir)
+                span.set(cpu_seconds=result.cpu_seconds, max_rss_mb=result.max_rss_mb,
+                         returncode=result.returncode, timed_out=result.timed_out)
+            with tracer.span("sandbox.collect"):
+                handles = get_artifact_store().collect(workdir) if result.returncode == 0 else []
     except Exception as e:
         raise ToolException(f"Unexpected error: {str(e)}")
+
+    if result.timed_out:
+        raise ToolException(
+            f"Execution timed out after {limits.timeout_seconds}s\n{result.usage_summary()}"
+        )
+    if result.returncode != 0:
+        raise ToolException(f"Error executing code: {result.stderr}\n{result.usage_summary()}")
+    if key is not None and not result.stdout_truncated:
+        get_execution_cache().put(key, result.stdout, handles, result.usage_summary())
+    return format_result(result.stdout, handles, result.usage_summary())
+
+
+def format_result(stdout, handles, usage):
+    """Renders the tool output: stdout, one line per artifact produced, then the usage line."""
+    store = get_artifact_store()
+    lines = [stdout]
+    lines += [f"[artifact] {store.name(handle)} -> {handle}" for handle in handles]
+    lines.append(usage)
+    return "\n".join(lines)
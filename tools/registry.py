@@ -0,0 +1,69 @@
+import importlib
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """
+    Declares a tool without importing it.
+
+    :param name: Name the LLM selects the tool by.
+    :param module: Module that defines the tool.
+    :param attribute: Attribute holding the tool, or a zero-argument factory if ``factory`` is set.
+    :param description: One-line description for prompts.
+    """
+    name: str
+    module: str
+    attribute: str
+    description: str
+    factory: bool = False
+
+
+TOOL_SPECS = [
+    ToolSpec("python_executor", "tools.pythontool", "execute_python_code", "Executes Python code"),
+    ToolSpec("Validate Code", "tools.validate_code", "validate_python_code_tool",
+             "Validates Python code before execution"),
+    ToolSpec("LLM Engine", "tools.llm_tool", "llm_engine_tool", "Uses LLM for analysis and reasoning"),
+    ToolSpec("sql_executor", "tools.mysql_tool", "SQLExecutorTool", "Executes SQL queries", factory=True),
+    ToolSpec("SQL Validator", "tools.mysql_tool", "sql_validator_tool", "Validates SQL queries"),
+    ToolSpec("get_mysql_database_schema", "tools.mysql_setup", "get_mysql_database_schema",
+             "Retrieves the database tables relevant to a question"),
+    ToolSpec("federated_sql", "tools.federation", "FederatedSQLTool",
+             "Joins query results from several named databases", factory=True),
+    ToolSpec("pandasai_analysis", "tools.pandasai_tool", "analyze_with_pandasai",
+             "Analyzes and charts whole database tables with pandasai"),
+]
+
+
+class LazyToolRegistry(Mapping):
+    """
+    Mapping of tool name to tool that imports a tool's module, and with it the tool's
+    heavy dependencies (database drivers, LLM clients), the first time it is looked up.
+    Listing the names never imports anything.
+    """
+
+    def __init__(self, specs: List[ToolSpec] = TOOL_SPECS):
+        self.specs: Dict[str, ToolSpec] = {spec.name: spec for spec in specs}
+        self._loaded: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Any:
+        tool = self._loaded.get(name)
+        if tool is not None:
+            return tool
+        spec = self.specs[name]
+        with self._lock:
+            if name not in self._loaded:
+                tool = getattr(importlib.import_module(spec.module), spec.attribute)
+                self._loaded[name] = tool() if spec.factory else tool
+            return self._loaded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
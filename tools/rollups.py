@@ -0,0 +1,479 @@
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from serialization import from_json, to_json
+from tracing import metrics, tracer
+from .sql_templates import fingerprint
+
+# Local store for rollups (":memory:" keeps them per process; a file path persists them)
+rollup_path = os.getenv("rollup_path", ":memory:")
+# Times an aggregate query shape must be seen before a rollup is built for it
+rollup_min_hits = int(os.getenv("rollup_min_hits", 3))
+rollup_max_tables = int(os.getenv("rollup_max_tables", 8))
+# Rollups keeping more than this fraction of the base table's rows are dropped as useless
+rollup_max_ratio = float(os.getenv("rollup_max_ratio", 0.5))
+# Tables rollups may be built for, each with the strictly increasing column (e.g. an
+# auto-increment id) that marks its new rows: "Sale_Report:id,Events:event_id". Only
+# list append-only tables; rows updated in place are not picked up
+rollup_watermarks = dict(
+    item.split(":", 1) for item in os.getenv("rollup_watermarks", "").split(",") if ":" in item
+)
+
+AGGREGATES = ("Sum", "Count", "Min", "Max", "Avg")
+# Functions that either read the clock or are unknown to the SQL translator
+UNSAFE_EXPRESSIONS = ("Anonymous", "Rand", "CurrentDate", "CurrentDatetime", "CurrentTime", "CurrentTimestamp")
+
+_managers: Dict[Any, "RollupManager"] = {}
+_managers_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    """
+    A rollup of one base table: one row per distinct combination of ``dimensions``,
+    holding COUNT(*) and the SUM, COUNT, MIN and MAX of every measure column.
+    """
+    table: str
+    dimensions: Tuple[str, ...]
+    measures: Tuple[str, ...]
+    watermark: str
+
+    @property
+    def name(self) -> str:
+        key = to_json([self.table, self.dimensions, self.measures, self.watermark])
+        return "rollup_" + hashlib.sha1(key.encode()).hexdigest()[:12]
+
+    def covers(self, other: "RollupSpec") -> bool:
+        return (self.table == other.table and set(other.dimensions) <= set(self.dimensions)
+                and set(other.measures) <= set(self.measures))
+
+
+@dataclass
+class RollupState:
+    """Refresh bookkeeping for one rollup."""
+    spec: RollupSpec
+    watermark_value: Any = None
+    refreshed_at: float = 0.0
+    rows: int = 0
+    base_rows: int = 0
+    refreshing: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+@dataclass(frozen=True)
+class AggregateShape:
+    """
+    What a query needs from a rollup, and its parsed form for rewriting. ``select_text``
+    holds each select expression as the user wrote it, which MySQL uses as the name of
+    unaliased expression columns.
+    """
+    spec: RollupSpec
+    tree: Any
+    select_text: Tuple[str, ...] = ()
+
+
+def _measure(column: str, kind: str) -> str:
+    return f"__{kind}__{column}"
+
+
+def _select_text(query: str) -> Tuple[str, ...]:
+    """The select-list expressions of a query, with their original spelling and spacing."""
+    import sqlparse
+    from sqlparse import sql, tokens
+
+    statement = sqlparse.parse(query)[0]
+    items = [token for token in statement.tokens if not token.is_whitespace]
+    for position, token in enumerate(items[:-1]):
+        if token.ttype is tokens.DML:
+            selected = items[position + 1]
+            if isinstance(selected, sql.IdentifierList):
+                return tuple(str(item).strip() for item in selected.get_identifiers())
+            return (str(selected).strip(),)
+    return ()
+
+
+def analyze_query(query: str) -> Optional[AggregateShape]:
+    """
+    Recognizes an aggregate over a single table listed in rollup_watermarks that a rollup
+    can answer exactly: no joins,
+    subqueries, window functions, DISTINCT aggregates or clock-dependent functions, and only
+    SUM, COUNT, MIN, MAX and AVG over plain columns.
+
+    :return: The AggregateShape, or None if no rollup could answer the query.
+    """
+    import sqlglot
+    from sqlglot import expressions as exp
+
+    try:
+        tree = sqlglot.parse_one(query, read="mysql")
+    except Exception:
+        return None
+    if not isinstance(tree, exp.Select) or tree.args.get("joins") or tree.args.get("with"):
+        return None
+    if tree.args.get("distinct") or tree.find(exp.Window) or tree.find(exp.Distinct):
+        return None
+    if any(select is not tree for select in tree.find_all(exp.Select)):
+        return None
+    if tree.find(*(getattr(exp, name) for name in UNSAFE_EXPRESSIONS)):
+        return None
+    source = tree.args.get("from")
+    if source is None or not isinstance(source.this, exp.Table) or source.this.args.get("db"):
+        return None
+
+    aggregates = list(tree.find_all(exp.AggFunc))
+    if not aggregates:
+        return None
+    measures = set()
+    for aggregate in aggregates:
+        if type(aggregate).__name__ not in AGGREGATES:
+            return None
+        argument = aggregate.this
+        if isinstance(argument, exp.Star) and isinstance(aggregate, exp.Count):
+            continue
+        if not isinstance(argument, exp.Column):
+            return None
+        measures.add(argument.name.lower())
+
+    # Every column used outside an aggregate must be a dimension; GROUP BY and ORDER BY
+    # may also name select aliases
+    aliases = {select.alias.lower() for select in tree.expressions if isinstance(select, exp.Alias)}
+    dimensions = set()
+    for column in tree.find_all(exp.Column):
+        if column.find_ancestor(exp.AggFunc):
+            continue
+        name = column.name.lower()
+        if name in aliases and not column.table and column.find_ancestor(exp.Group, exp.Order, exp.Having):
+            continue
+        dimensions.add(name)
+
+    table = source.this.name
+    if table not in rollup_watermarks:
+        return None
+    spec = RollupSpec(
+        table=table,
+        dimensions=tuple(sorted(dimensions)),
+        measures=tuple(sorted(measures)),
+        watermark=rollup_watermarks[table],
+    )
+    return AggregateShape(spec=spec, tree=tree, select_text=_select_text(query))
+
+
+def rewrite_query(shape: AggregateShape, rollup_name: str) -> str:
+    """Rewrites the query to re-aggregate the rollup's partial aggregates, in DuckDB SQL."""
+    from sqlglot import expressions as exp
+
+    tree = shape.tree.copy()
+    # Unaliased expressions keep the name MySQL gives them: their text as written
+    if len(shape.select_text) != len(tree.expressions):
+        raise ValueError("Could not match the select list to the query text")
+    for select, text in zip(list(tree.expressions), shape.select_text):
+        if not isinstance(select, (exp.Alias, exp.Column)):
+            select.replace(exp.alias_(select.copy(), text, quoted=True))
+
+    def partial(column: str, kind: str):
+        return exp.column(_measure(column, kind), quoted=True)
+
+    for aggregate in list(tree.find_all(exp.AggFunc)):
+        argument = aggregate.this
+        if isinstance(aggregate, exp.Count):
+            counted = "__count" if isinstance(argument, exp.Star) else _measure(argument.name.lower(), "count")
+            replacement = exp.func("COALESCE", exp.Sum(this=exp.column(counted, quoted=True)), exp.Literal.number(0))
+        elif isinstance(aggregate, exp.Avg):
+            column = argument.name.lower()
+            replacement = exp.Div(
+                this=exp.Sum(this=partial(column, "sum")),
+                expression=exp.func("NULLIF", exp.Sum(this=partial(column, "count")), exp.Literal.number(0)),
+            )
+        else:
+            kind = type(aggregate).__name__.lower()
+            outer = exp.Sum if kind == "sum" else type(aggregate)
+            replacement = outer(this=partial(argument.name.lower(), kind))
+        aggregate.replace(replacement)
+
+    table = tree.args["from"].this
+    table.replace(exp.alias_(exp.table_(rollup_name), table.alias_or_name, table=True))
+    return tree.sql(dialect="duckdb")
+
+
+class RollupManager:
+    """
+    Learns the most frequent aggregate query shapes run through the SQL tool and keeps
+    local precomputed rollups for them in DuckDB.
+
+    Every executed query is passed to observe(). Once an aggregate shape has been seen
+    rollup_min_hits times, a rollup over the dimensions and measures it uses is built in
+    the background from one GROUP BY on the base table. Shapes grouping or filtering on
+    the watermark column, or whose dimensions have too many distinct combinations (counted
+    on the base database first), are rejected without building anything. Later queries answerable from a
+    rollup (see analyze_query) are rewritten to re-aggregate it (answer()); anything else,
+    or anything the rewrite fails on, returns None and runs against the base table.
+
+    Before answering, the base table's current MAX(watermark) and row count are compared
+    with the rollup's. If either differs, the query runs on the base table and the rollup
+    is refreshed in the background: only rows whose watermark is above the last one seen
+    are aggregated and merged. That is exact for append-only tables with a strictly
+    increasing watermark (an auto-increment id); a rollup whose row count still differs
+    afterwards (rows were deleted) is dropped. Rows updated in place are not detected,
+    which is why rollups are limited to the tables listed in rollup_watermarks. Text
+    dimensions compare case- and accent-insensitively, as MySQL's default collations do.
+
+    :param pool: ConnectionPool for the base tables.
+    """
+
+    def __init__(self, pool: Any, path: str = rollup_path):
+        import duckdb
+
+        self.pool = pool
+        self.db = duckdb.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS rollup_catalog (name VARCHAR PRIMARY KEY, spec VARCHAR, "
+            "watermark_value VARCHAR, rows BIGINT, base_rows BIGINT)"
+        )
+        self.hits: Counter = Counter()
+        self.rollups: Dict[str, RollupState] = {}
+        self.rejected = set()
+        self._building = set()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        for name, spec, watermark_value, rows, base_rows in self.db.execute(
+                "SELECT name, spec, watermark_value, rows, base_rows FROM rollup_catalog").fetchall():
+            spec = RollupSpec(**{key: tuple(value) if isinstance(value, list) else value
+                                 for key, value in from_json(spec).items()})
+            self.rollups[name] = RollupState(spec, from_json(watermark_value), 0.0, rows, base_rows)
+
+    def _find(self, spec: RollupSpec) -> Optional[RollupState]:
+        """The smallest rollup able to answer a query needing spec."""
+        candidates = [state for state in self.rollups.values() if state.spec.covers(spec)]
+        return min(candidates, key=lambda state: state.rows, default=None)
+
+    def observe(self, query: str) -> None:
+        """Counts an executed query towards its shape, building a rollup once the shape is frequent."""
+        shape = analyze_query(query)
+        if shape is None or shape.spec.name in self.rejected:
+            return
+        key = fingerprint(query)
+        with self._lock:
+            self.hits[key] += 1
+            if (self.hits[key] < rollup_min_hits or self._find(shape.spec) is not None
+                    or len(self.rollups) >= rollup_max_tables or shape.spec.name in self._building):
+                return
+            self._building.add(shape.spec.name)
+        threading.Thread(target=self._build, args=(shape.spec,), daemon=True,
+                         name=f"rollup-{shape.spec.name}").start()
+
+    def answer(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Answers a query from an up-to-date rollup, or returns None if the base table has to."""
+        if not self.rollups:
+            return None
+        shape = analyze_query(query)
+        if shape is None:
+            return None
+        with self._lock:
+            state = self._find(shape.spec)
+        if state is None:
+            return None
+        try:
+            with tracer.span("sql.rollup", rollup=state.spec.name, rows=state.rows):
+                high, base_rows = self._probe(state.spec)
+                if high != state.watermark_value or base_rows != state.base_rows:
+                    metrics.increment("sql.rollup.stale")
+                    self._refresh_in_background(state)
+                    return None
+                sql = rewrite_query(shape, state.spec.name)
+                cursor = self.db.cursor()
+                try:
+                    cursor.execute(sql)
+                    columns = [column[0] for column in cursor.description]
+                    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                finally:
+                    cursor.close()
+        except Exception as e:
+            print(f"Rollup {state.spec.name} could not answer the query: {e}")
+            metrics.increment("sql.rollup.fallbacks")
+            return None
+        metrics.increment("sql.rollup.hits")
+        return results
+
+    def _probe(self, spec: RollupSpec) -> Tuple[Any, int]:
+        """The base table's current (MAX(watermark), row count)."""
+        with self.pool.connection() as connection:
+            with connection.cursor(dictionary=True) as cursor:
+                cursor.execute(f"SELECT MAX(`{spec.watermark}`) AS high, COUNT(*) AS base_rows FROM `{spec.table}`")
+                row = cursor.fetchall()[0]
+        return row["high"], int(row["base_rows"])
+
+    def _refresh_in_background(self, state: RollupState) -> None:
+        with self._lock:
+            if state.refreshing:
+                return
+            state.refreshing = True
+
+        def run():
+            try:
+                self.refresh(state)
+                high, base_rows = self._probe(state.spec)
+                if high == state.watermark_value and base_rows != state.base_rows:
+                    # Rows were deleted below the watermark: the rollup cannot catch up
+                    print(f"Rollup {state.spec.name} no longer matches {state.spec.table}; dropping it")
+                    with self._lock:
+                        self.rollups.pop(state.spec.name, None)
+                    self._reject(state.spec)
+            except Exception as e:
+                print(f"Could not refresh rollup {state.spec.name}: {e}")
+            finally:
+                state.refreshing = False
+
+        threading.Thread(target=run, daemon=True, name=f"rollup-refresh-{state.spec.name}").start()
+
+    def _estimate(self, spec: RollupSpec) -> Tuple[int, int]:
+        """
+        Returns (base rows, rollup rows) for a rollup not built yet, counting groups on the
+        base database only up to the most rollup_max_ratio allows, so nothing is fetched.
+        """
+        dimensions = ", ".join(f"`{dimension}`" for dimension in spec.dimensions)
+        with self.pool.connection() as connection:
+            with connection.cursor(dictionary=True) as cursor:
+                cursor.execute(f"SELECT COUNT(*) AS base_rows FROM `{spec.table}`")
+                base_rows = int(cursor.fetchall()[0]["base_rows"])
+                if not spec.dimensions:
+                    return base_rows, min(base_rows, 1)
+                limit = int(base_rows * rollup_max_ratio) + 1
+                cursor.execute(
+                    f"SELECT COUNT(*) AS group_count FROM (SELECT 1 FROM `{spec.table}` GROUP BY {dimensions} "
+                    f"LIMIT {limit}) AS rollup_groups"
+                )
+                return base_rows, int(cursor.fetchall()[0]["group_count"])
+
+    def _reject(self, spec: RollupSpec) -> None:
+        self.rejected.add(spec.name)
+        with self._db_lock:
+            self.db.execute(f'DROP TABLE IF EXISTS "{spec.name}"')
+            self.db.execute("DELETE FROM rollup_catalog WHERE name = ?", [spec.name])
+
+    def _build(self, spec: RollupSpec) -> None:
+        state = RollupState(spec)
+        try:
+            with tracer.span("sql.rollup.build", rollup=spec.name) as span:
+                # Grouping by the watermark keeps one row per base row; point lookups such as
+                # WHERE id = 5 have that shape
+                if spec.watermark in spec.dimensions:
+                    self._reject(spec)
+                    return
+                base_rows, groups = self._estimate(spec)
+                span.set(base_rows=base_rows, groups=groups)
+                if base_rows and groups > base_rows * rollup_max_ratio:
+                    self._reject(spec)
+                    return
+                self.refresh(state)
+            if state.base_rows and state.rows > state.base_rows * rollup_max_ratio:
+                # Hardly smaller than the base table, so not worth keeping
+                self._reject(spec)
+                return
+            with self._lock:
+                self.rollups[spec.name] = state
+        except Exception as e:
+            print(f"Could not build rollup for {spec.table}: {e}")
+            self.rejected.add(spec.name)
+        finally:
+            with self._lock:
+                self._building.discard(spec.name)
+
+    def refresh(self, state: RollupState) -> None:
+        """Aggregates the base rows added since the last refresh and merges them into the rollup."""
+        with state.lock:
+            spec = state.spec
+            delta, high = self._load_delta(spec, state.watermark_value)
+            if delta is not None:
+                self._merge(spec, delta, exists=state.watermark_value is not None)
+            if high is not None:
+                state.watermark_value = high
+            with self._db_lock:
+                cursor = self.db.cursor()
+                try:
+                    rows, base_rows = cursor.execute(
+                        f'SELECT COUNT(*), COALESCE(SUM("__count"), 0) FROM "{spec.name}"'
+                    ).fetchone() if state.watermark_value is not None else (0, 0)
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO rollup_catalog VALUES (?, ?, ?, ?, ?)",
+                        [spec.name, to_json(spec.__dict__), to_json(state.watermark_value), rows, base_rows],
+                    )
+                finally:
+                    cursor.close()
+            state.rows, state.base_rows = rows, int(base_rows)
+            state.refreshed_at = time.monotonic()
+
+    def _load_delta(self, spec: RollupSpec, low: Any) -> Tuple[Optional[Any], Any]:
+        """Aggregates base rows with low < watermark <= the current maximum, on the base database."""
+        import pyarrow as pa
+
+        def quote(name):
+            return f"`{name}`"
+
+        with self.pool.connection() as connection:
+            with connection.cursor(dictionary=True) as cursor:
+                cursor.execute(f"SELECT MAX({quote(spec.watermark)}) AS high FROM {quote(spec.table)}")
+                high = cursor.fetchall()[0]["high"]
+                if high is None or high == low:
+                    return None, low
+                columns = [quote(dimension) for dimension in spec.dimensions] + ["COUNT(*) AS `__count`"]
+                for measure in spec.measures:
+                    columns += [
+                        f"SUM({quote(measure)}) AS {quote(_measure(measure, 'sum'))}",
+                        f"COUNT({quote(measure)}) AS {quote(_measure(measure, 'count'))}",
+                        f"MIN({quote(measure)}) AS {quote(_measure(measure, 'min'))}",
+                        f"MAX({quote(measure)}) AS {quote(_measure(measure, 'max'))}",
+                    ]
+                query = f"SELECT {', '.join(columns)} FROM {quote(spec.table)} WHERE {quote(spec.watermark)} <= %s"
+                params = [high]
+                if low is not None:
+                    query += f" AND {quote(spec.watermark)} > %s"
+                    params.append(low)
+                if spec.dimensions:
+                    query += f" GROUP BY {', '.join(quote(dimension) for dimension in spec.dimensions)}"
+                cursor.execute(query, tuple(params))
+                rows = cursor.fetchall()
+        if not rows:
+            return None, high
+        return pa.Table.from_pylist(rows), high
+
+    def _merge(self, spec: RollupSpec, delta: Any, exists: bool) -> None:
+        dimensions = [f'"{dimension}"' for dimension in spec.dimensions]
+        # Text dimensions compare like MySQL's default case- and accent-insensitive collations
+        selected = [
+            f'{dimension} COLLATE NOCASE.NOACCENT AS {dimension}'
+            if delta.schema.field(name).type in ("string", "large_string") else dimension
+            for name, dimension in zip(spec.dimensions, dimensions)
+        ]
+        partials = ['SUM("__count") AS "__count"']
+        for measure in spec.measures:
+            for kind, combine in (("sum", "SUM"), ("count", "SUM"), ("min", "MIN"), ("max", "MAX")):
+                column = f'"{_measure(measure, kind)}"'
+                partials.append(f"{combine}({column}) AS {column}")
+        with self._db_lock:
+            cursor = self.db.cursor()
+            try:
+                cursor.register("rollup_delta", delta)
+                source = "SELECT * FROM rollup_delta"
+                if exists:
+                    source = f'SELECT * FROM "{spec.name}" UNION ALL BY NAME {source}'
+                group_by = f" GROUP BY {', '.join(dimensions)}" if dimensions else ""
+                cursor.execute(
+                    f'CREATE OR REPLACE TABLE "{spec.name}" AS SELECT {", ".join(selected + partials)} '
+                    f"FROM ({source}){group_by}"
+                )
+            finally:
+                cursor.close()
+
+
+def get_rollup_manager(pool: Any) -> RollupManager:
+    """Returns the process-wide rollup manager for a connection pool."""
+    with _managers_lock:
+        manager = _managers.get(pool)
+        if manager is None:
+            manager = _managers[pool] = RollupManager(pool)
+        return manager
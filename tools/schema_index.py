@@ -0,0 +1,169 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Field weights: a question word matching a table name is a much stronger
+# signal than one matching a column comment.
+TABLE_NAME_WEIGHT = 3
+COLUMN_NAME_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+# Share of a neighbour's score a table inherits through a foreign key.
+FK_NEIGHBOUR_BOOST = 0.3
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "by", "for", "from", "how", "in", "is", "it",
+    "me", "of", "on", "or", "per", "show", "the", "to", "was", "were", "what", "which",
+    "who", "with", "give", "list", "get", "find", "all", "each", "many", "much", "do",
+    "does", "did", "there", "their", "this", "that", "these", "those",
+}
+
+_CAMEL_RE = re.compile(r"([a-z0-9])([A-Z])")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(token: str) -> str:
+    """Very light plural stripping so 'sales' matches 'Sale_Report'."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split identifiers and free text into lowercase search terms."""
+    if not text:
+        return []
+    text = _CAMEL_RE.sub(r"\1 \2", text).lower()
+    return [
+        _stem(token) for token in _TOKEN_RE.findall(text)
+        if token not in STOPWORDS
+    ]
+
+
+class SchemaIndex:
+    """
+    A local BM25 index over a database schema.
+
+    Each table is one document built from its name, its column names and the table
+    and column comments. Foreign keys are kept as an undirected graph so that tables
+    joined to a strong match are pulled in with it.
+
+    :param tables: Mapping of table name to ``{"comment": str, "columns": [...], "foreign_keys": [...]}``
+        where each column is ``{"name", "type", "comment"}`` and each foreign key is
+        ``{"column", "referenced_table", "referenced_column"}``.
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.tables = tables
+        self.k1 = k1
+        self.b = b
+        self.neighbours: Dict[str, Set[str]] = defaultdict(set)
+        self.term_freqs: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_freqs: Counter = Counter()
+
+        for table_name, table in tables.items():
+            terms = Counter()
+            for token in tokenize(table_name):
+                terms[token] += TABLE_NAME_WEIGHT
+            for token in tokenize(table.get("comment")):
+                terms[token] += COMMENT_WEIGHT
+            for column in table.get("columns", []):
+                for token in tokenize(column["name"]):
+                    terms[token] += COLUMN_NAME_WEIGHT
+                for token in tokenize(column.get("comment")):
+                    terms[token] += COMMENT_WEIGHT
+            self.term_freqs[table_name] = terms
+            self.doc_lengths[table_name] = sum(terms.values())
+            self.doc_freqs.update(terms.keys())
+
+            for fk in table.get("foreign_keys", []):
+                referenced = fk["referenced_table"]
+                if referenced in tables and referenced != table_name:
+                    self.neighbours[table_name].add(referenced)
+                    self.neighbours[referenced].add(table_name)
+
+        self.avg_doc_length = (
+            sum(self.doc_lengths.values()) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        )
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def _idf(self, term: str) -> float:
+        n = len(self.tables)
+        df = self.doc_freqs.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, question: str) -> Dict[str, float]:
+        """Returns the BM25 score of every table that shares at least one term with the question."""
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(question)):
+            if term not in self.doc_freqs:
+                continue
+            idf = self._idf(term)
+            for table_name, terms in self.term_freqs.items():
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                norm = 1 - self.b + self.b * self.doc_lengths[table_name] / (self.avg_doc_length or 1)
+                scores[table_name] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return dict(scores)
+
+    def search(self, question: str, top_k: int = 8, max_neighbours: Optional[int] = None) -> List[str]:
+        """
+        Selects the tables most relevant to the question.
+
+        Direct BM25 matches are ranked first (boosted by the scores of their foreign-key
+        neighbours), then the foreign-key neighbours of the selected tables are appended
+        so the LLM can see the join path, up to ``max_neighbours`` extra tables.
+
+        :return: Table names, most relevant first. Empty if nothing in the schema matches.
+        """
+        base = self.score(question)
+        if not base:
+            return []
+
+        boosted = {
+            table_name: score + FK_NEIGHBOUR_BOOST * max(
+                (base.get(n, 0.0) for n in self.neighbours.get(table_name, ())), default=0.0
+            )
+            for table_name, score in base.items()
+        }
+        selected = sorted(boosted, key=lambda name: (-boosted[name], name))[:top_k]
+
+        if max_neighbours is None:
+            max_neighbours = max(1, top_k // 2)
+        chosen = set(selected)
+        extra: List[str] = []
+        for table_name in selected:
+            for neighbour in sorted(self.neighbours.get(table_name, ())):
+                if len(extra) >= max_neighbours:
+                    break
+                if neighbour not in chosen:
+                    chosen.add(neighbour)
+                    extra.append(neighbour)
+        return selected + extra
+
+    def schema(self, table_names: Optional[Iterable[str]] = None) -> Dict[str, List[Dict[str, str]]]:
+        """Renders the given tables (default: all of them) in the shape the schema tool returns."""
+        if table_names is None:
+            table_names = self.tables.keys()
+        schema_info = {}
+        for table_name in table_names:
+            table = self.tables[table_name]
+            references = {
+                fk["column"]: f"{fk['referenced_table']}.{fk['referenced_column']}"
+                for fk in table.get("foreign_keys", [])
+            }
+            columns = []
+            for column in table.get("columns", []):
+                column_info = {"name": column["name"], "type": column["type"]}
+                if column["name"] in references:
+                    column_info["references"] = references[column["name"]]
+                columns.append(column_info)
+            schema_info[table_name] = columns
+        return schema_info
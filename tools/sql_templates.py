@@ -0,0 +1,181 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Optional, Tuple
+
+import sqlparse
+from sqlparse import tokens as T
+
+# Prepared statements kept open per connection (MySQL caps them server-wide with max_prepared_stmt_count)
+sql_prepared_cache_size = int(os.getenv("sql_prepared_cache_size", 32))
+
+# Clauses whose literals become parameters. Literals elsewhere (select list, GROUP BY,
+# ORDER BY) stay in the template: ORDER BY 2 means a column, and MySQL only matches
+# a select expression to its GROUP BY expression when the literals are spelled out.
+PARAMETER_CLAUSES = {"WHERE", "HAVING", "ON", "LIMIT", "OFFSET", "VALUES"}
+TEMPLATE_CLAUSES = {"SELECT", "FROM", "GROUP BY", "ORDER BY", "PARTITION BY", "WINDOW", "UNION", "UNION ALL"}
+# Keywords introducing a typed literal (DATE '2024-01-01'), which cannot take a placeholder
+TYPED_LITERAL_PREFIXES = {"DATE", "TIME", "TIMESTAMP", "INTERVAL"}
+
+
+@dataclass(frozen=True)
+class QueryTemplate:
+    """
+    A query with its literals replaced by ``%s`` placeholders.
+
+    :param template: Normalized query text: comments dropped, whitespace collapsed.
+    :param params: The extracted literals, in placeholder order.
+    :param fingerprint: Hash of the template, equal for queries differing only in extracted literals.
+    """
+    template: str
+    params: Tuple[Any, ...]
+    fingerprint: str
+
+
+def _literal_value(token) -> Any:
+    value = token.value.lstrip("+-")
+    if token.ttype is T.Literal.Number.Integer:
+        return int(value)
+    if token.ttype is T.Literal.Number.Float:
+        # Exact decimals stay exact; only exponent notation is a float in MySQL too
+        return float(value) if "e" in value.lower() else Decimal(value)
+    return value[1:-1].replace("''", "'")
+
+
+def _is_parameter(token, previous) -> bool:
+    if token.ttype in (T.Literal.Number.Integer, T.Literal.Number.Float):
+        return True
+    if token.ttype is not T.Literal.String.Single or "\\" in token.value:
+        # Backslash escapes are left to the server
+        return False
+    # Charset introducers (_utf8mb4'x', N'x') and typed literals keep their literal
+    if previous is not None and previous.value.upper() in TYPED_LITERAL_PREFIXES:
+        return False
+    return True
+
+
+def parameterize(query: str) -> Optional[QueryTemplate]:
+    """
+    Extracts the literals of a single SELECT statement into parameters.
+
+    :return: The QueryTemplate, or None when the query is not a single SELECT or keeps a
+        literal containing ``%s`` (which the driver would take for a placeholder).
+    """
+    statements = [statement for statement in sqlparse.parse(query) if str(statement).strip(" \n\t;")]
+    if len(statements) != 1 or statements[0].get_type() != "SELECT":
+        return None
+
+    parts, params = [], []
+    clause = "SELECT"
+    previous = None
+    pending_space = False
+    for token in statements[0].flatten():
+        if token.is_whitespace:
+            pending_space = bool(parts)
+            continue
+        if token.ttype in T.Comment:
+            # Optimizer hints and version comments change the plan, so they are kept
+            if not token.value.startswith(("/*+", "/*!")):
+                pending_space = bool(parts)
+                continue
+        if token.ttype is T.Punctuation and token.value == ";":
+            continue
+        if pending_space:
+            parts.append(" ")
+            pending_space = False
+        # A literal directly after a name is a charset introducer (_utf8mb4'x')
+        introduced = previous is not None and previous.ttype in T.Name and not parts[-1] == " "
+
+        if token.ttype in T.Keyword:
+            keyword = " ".join(token.value.upper().split())
+            if keyword in PARAMETER_CLAUSES or keyword in TEMPLATE_CLAUSES:
+                clause = keyword
+            parts.append(token.value)
+        elif clause in PARAMETER_CLAUSES and not introduced and _is_parameter(token, previous):
+            sign = token.value[0] if token.value[0] in "+-" else ""
+            parts.append(f"{sign}%s")
+            params.append(_literal_value(token))
+        else:
+            parts.append(token.value)
+        previous = token
+
+    template = "".join(parts)
+    if template.count("%s") != len(params):
+        return None
+    fingerprint = hashlib.sha1(template.encode()).hexdigest()
+    return QueryTemplate(template=template, params=tuple(params), fingerprint=fingerprint)
+
+
+def fingerprint(query: str) -> str:
+    """Template fingerprint of a query; queries that cannot be templated hash their collapsed text."""
+    template = parameterize(query)
+    if template is not None:
+        return template.fingerprint
+    return hashlib.sha1(" ".join(query.split()).encode()).hexdigest()
+
+
+class PreparedStatementCache:
+    """
+    Per-connection LRU of server-side prepared statements, keyed by template fingerprint.
+
+    Each statement is a prepared cursor (``connection.cursor(prepared=True)``) that is
+    kept open; executing it again with new parameters skips the server's parse and plan.
+    The driver only reuses the statement when given the very same operation string, so
+    each entry keeps the string it was prepared with. Connections are held weakly and
+    their statements go when the connection does.
+    """
+
+    def __init__(self, max_statements: int = sql_prepared_cache_size):
+        self.max_statements = max_statements
+        self._statements: "weakref.WeakKeyDictionary[Any, OrderedDict]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def cursor_for(self, connection: Any, template: QueryTemplate) -> Tuple[Any, str, bool]:
+        """
+        Returns the prepared cursor for a template on a connection, the operation string to
+        execute it with, and whether it was already prepared.
+        """
+        with self._lock:
+            statements = self._statements.setdefault(connection, OrderedDict())
+            entry = statements.get(template.fingerprint)
+            if entry is not None:
+                statements.move_to_end(template.fingerprint)
+                return entry[0], entry[1], True
+        cursor = connection.cursor(prepared=True, dictionary=True)
+        evicted = []
+        with self._lock:
+            statements[template.fingerprint] = (cursor, template.template)
+            while len(statements) > self.max_statements:
+                evicted.append(statements.popitem(last=False)[1][0])
+        for stale in evicted:
+            self._close(stale)
+        return cursor, template.template, False
+
+    def discard(self, connection: Any, fingerprint: str) -> None:
+        """Drops a statement, e.g. after it failed and may be left in an unknown state."""
+        with self._lock:
+            entry = self._statements.get(connection, {}).pop(fingerprint, None)
+        if entry is not None:
+            self._close(entry[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(statements) for statements in self._statements.values())
+
+    @staticmethod
+    def _close(cursor: Any) -> None:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+_statement_cache = PreparedStatementCache()
+
+
+def get_statement_cache() -> PreparedStatementCache:
+    return _statement_cache
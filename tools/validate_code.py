@@ -16,6 +16,14 @@ def validate_code(code: str) -> bool:
         return False
 
 
+def normalize_code(code: str) -> str:
+    """
+    Return a canonical form of the code: the dump of its AST, which ignores comments,
+    blank lines and formatting. Raises SyntaxError for invalid code.
+    """
+    return ast.dump(ast.parse(code))
+
+
 def validate_python_code(code: str) -> str:
     """Check if the provided Python code is valid."""
     try:
@@ -0,0 +1,431 @@
+"""
+Slow-query workload recorder and index advisor.
+
+Every query SQLExecutorTool runs is recorded by template fingerprint with its latency,
+row count and (once per fingerprint and hour, and for slow runs) its EXPLAIN plan. The
+report ranks fingerprints by total time and proposes indexes on the columns they filter,
+join, group and sort on that no existing index covers:
+
+    python -m tools.workload report --limit 20
+    python -m tools.workload report --json workload.json
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from serialization import from_json, to_json, to_json_bytes
+from .sql_templates import fingerprint as query_fingerprint, parameterize
+
+workload_enabled = os.getenv("workload_enabled", "1") != "0"
+workload_db_path = os.getenv("workload_db_path", os.path.join("media", "workload.sqlite3"))
+# Runs slower than this get a fresh EXPLAIN if the stored one is older than workload_explain_ttl
+workload_slow_ms = float(os.getenv("workload_slow_ms", 500))
+workload_explain_ttl = float(os.getenv("workload_explain_ttl", 3600))
+workload_explain_prefix = os.getenv("workload_explain_prefix", "EXPLAIN FORMAT=JSON")
+# Individual executions are kept this long for latency percentiles
+workload_retention_days = float(os.getenv("workload_retention_days", 7))
+# Columns per proposed index
+workload_max_index_columns = int(os.getenv("workload_max_index_columns", 4))
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+class WorkloadRecorder:
+    """
+    Records executed queries to a SQLite store. record() only enqueues; a background
+    thread writes the store and runs EXPLAINs on a pooled connection, so recording never
+    adds a round trip to the query itself.
+    """
+
+    def __init__(self, path: str = workload_db_path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                fingerprint TEXT PRIMARY KEY,
+                template TEXT NOT NULL,
+                sample_query TEXT NOT NULL,
+                calls INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                max_ms REAL NOT NULL DEFAULT 0,
+                total_rows INTEGER NOT NULL DEFAULT 0,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                plan TEXT,
+                plan_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS executions (
+                fingerprint TEXT NOT NULL,
+                started REAL NOT NULL,
+                latency_ms REAL NOT NULL,
+                rows INTEGER,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS executions_fingerprint ON executions (fingerprint, latency_ms);
+            CREATE INDEX IF NOT EXISTS executions_started ON executions (started);
+            """
+        )
+        self._db.commit()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._drain, daemon=True, name="workload-recorder")
+        self._writer.start()
+
+    def record(self, query: str, latency_ms: float, rows: Optional[int], error: Optional[str] = None,
+               pool: Any = None) -> None:
+        """Queues one execution; pool, if given, is used to EXPLAIN the query."""
+        self._queue.put((query, time.time(), latency_ms, rows, error, pool))
+
+    def flush(self, timeout: float = 10) -> None:
+        """Waits until everything recorded so far is written."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"Could not record query workload: {e}")
+
+    def _write(self, query: str, started: float, latency_ms: float, rows: Optional[int],
+               error: Optional[str], pool: Any) -> None:
+        template = parameterize(query)
+        if template is not None:
+            fingerprint, text = template.fingerprint, template.template
+        else:
+            fingerprint, text = query_fingerprint(query), " ".join(query.split())
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO fingerprints (fingerprint, template, sample_query, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (fingerprint) DO NOTHING",
+                (fingerprint, text, query, started, started),
+            )
+            self._db.execute(
+                "UPDATE fingerprints SET calls = calls + 1, errors = errors + ?, total_ms = total_ms + ?, "
+                "max_ms = MAX(max_ms, ?), total_rows = total_rows + ?, last_seen = ?, "
+                "sample_query = CASE WHEN ? >= max_ms THEN ? ELSE sample_query END WHERE fingerprint = ?",
+                (1 if error else 0, latency_ms, latency_ms, rows or 0, started, latency_ms, query, fingerprint),
+            )
+            self._db.execute(
+                "INSERT INTO executions (fingerprint, started, latency_ms, rows, error) VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, started, latency_ms, rows, error),
+            )
+            self._db.execute(
+                "DELETE FROM executions WHERE started < ?", (time.time() - workload_retention_days * 86400,)
+            )
+            plan_at = self._db.execute(
+                "SELECT plan_at FROM fingerprints WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()[0]
+            self._db.commit()
+
+        stale = plan_at is None or (latency_ms >= workload_slow_ms and time.time() - plan_at > workload_explain_ttl)
+        if pool is not None and error is None and stale:
+            plan = explain(pool, query)
+            with self._lock:
+                self._db.execute(
+                    "UPDATE fingerprints SET plan = ?, plan_at = ? WHERE fingerprint = ?",
+                    (to_json(plan) if plan is not None else None, time.time(), fingerprint),
+                )
+                self._db.commit()
+
+    def fingerprints(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The most expensive fingerprints by total time, with latency percentiles and plan summary."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT fingerprint, template, sample_query, calls, errors, total_ms, max_ms, total_rows, plan "
+                "FROM fingerprints ORDER BY total_ms DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+            latencies_by_fingerprint = {
+                row[0]: [latency for (latency,) in self._db.execute(
+                    "SELECT latency_ms FROM executions WHERE fingerprint = ? ORDER BY latency_ms", (row[0],)
+                )]
+                for row in rows
+            }
+        ranked = []
+        for fingerprint, template, sample_query, calls, errors, total_ms, max_ms, total_rows, plan in rows:
+            latencies = latencies_by_fingerprint[fingerprint]
+            plan = from_json(plan) if plan else None
+            ranked.append({
+                "fingerprint": fingerprint,
+                "calls": calls,
+                "errors": errors,
+                "total_ms": total_ms,
+                "avg_ms": total_ms / calls if calls else 0.0,
+                "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+                "max_ms": max_ms,
+                "avg_rows": total_rows / calls if calls else 0.0,
+                "full_scans": sorted(full_scans(plan)) if plan is not None else None,
+                "template": template,
+                "sample_query": sample_query,
+            })
+        return ranked
+
+
+def get_workload_recorder() -> WorkloadRecorder:
+    """Returns the process-wide recorder, creating it on first use."""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = WorkloadRecorder()
+        return _recorder
+
+
+def explain(pool: Any, query: str) -> Optional[Any]:
+    """Runs EXPLAIN on a pooled connection; returns the parsed JSON plan, or None if unavailable."""
+    try:
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"{workload_explain_prefix} {query}")
+                row = cursor.fetchall()[0]
+            finally:
+                cursor.close()
+        plan = row[0] if isinstance(row, (tuple, list)) else next(iter(row.values()))
+        return from_json(plan) if isinstance(plan, (str, bytes)) else plan
+    except Exception:
+        return None
+
+
+def full_scans(plan: Any) -> set:
+    """Tables a MySQL JSON plan reads with a full scan (access_type ALL)."""
+    tables = set()
+    if isinstance(plan, dict):
+        if plan.get("access_type") == "ALL" and "table_name" in plan:
+            tables.add(plan["table_name"])
+        for value in plan.values():
+            tables |= full_scans(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            tables |= full_scans(value)
+    return tables
+
+
+def index_columns(query: str, schema: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+    """
+    Picks index columns per table from a query, in index order: columns compared for
+    equality (including IN and join conditions), then GROUP BY and ORDER BY columns, then
+    one column compared by range. Of a join condition only the column of the table joined
+    later is used: that is the side probed for each outer row. Unqualified columns in
+    multi-table queries are resolved through schema (table -> column names) when given.
+    """
+    import sqlglot
+    from sqlglot import expressions as exp
+
+    try:
+        tree = sqlglot.parse_one(query, read="mysql")
+    except Exception:
+        return {}
+    tables = {table.alias_or_name: table.name for table in tree.find_all(exp.Table)}
+    if not tables:
+        return {}
+    owners = defaultdict(set)
+    for table, columns in (schema or {}).items():
+        for column in columns:
+            owners[column.lower()].add(table)
+
+    def table_of(column) -> Optional[str]:
+        if column.table:
+            return tables.get(column.table)
+        if len(set(tables.values())) == 1:
+            return next(iter(tables.values()))
+        candidates = owners.get(column.name.lower(), set()) & set(tables.values())
+        return next(iter(candidates)) if len(candidates) == 1 else None
+
+    roles: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: {"eq": [], "sort": [], "range": []})
+
+    def add(column, role: str) -> None:
+        table = table_of(column)
+        if table is not None and column.name not in roles[table][role]:
+            roles[table][role].append(column.name)
+
+    # Tables in join order: the FROM table, then each joined one (comma joins included)
+    order = [tree.args["from"].this.alias_or_name] if tree.args.get("from") else []
+    order += [join.this.alias_or_name for join in tree.args.get("joins") or []]
+
+    def position(column) -> int:
+        table = table_of(column)
+        aliases = [alias for alias, name in tables.items() if name == table]
+        if column.table:
+            aliases = [column.table]
+        return max((order.index(alias) for alias in aliases if alias in order), default=-1)
+
+    for predicate in tree.find_all(exp.EQ, exp.In, exp.NullSafeEQ):
+        if predicate.find_ancestor(exp.Where, exp.Join) is None:
+            continue
+        left, right = predicate.this, predicate.expression
+        if (isinstance(left, exp.Column) and isinstance(right, exp.Column)
+                and table_of(left) != table_of(right)):
+            # Join condition: index only the inner side
+            inner = max((left, right), key=position)
+            if position(inner) >= 0 and position(left) != position(right):
+                add(inner, "eq")
+            continue
+        for column in predicate.find_all(exp.Column):
+            add(column, "eq")
+    for predicate in tree.find_all(exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between, exp.Like):
+        column = predicate.this
+        if not isinstance(column, exp.Column) or predicate.find_ancestor(exp.Where, exp.Join) is None:
+            continue
+        if isinstance(predicate, exp.Like):
+            # Only a literal prefix can be looked up in an index: 'abc%' but not '%abc'
+            pattern = predicate.expression
+            if not (isinstance(pattern, exp.Literal) and pattern.is_string and pattern.this
+                    and pattern.this[0] not in "%_"):
+                continue
+        add(column, "range")
+    aliases = {select.alias for select in tree.expressions if isinstance(select, exp.Alias)}
+    for clause in tree.find_all(exp.Group, exp.Order):
+        for column in clause.find_all(exp.Column):
+            if column.name not in aliases or column.table:
+                add(column, "sort")
+
+    candidates = {}
+    for table, columns in roles.items():
+        ordered = list(columns["eq"])
+        ordered += [column for column in columns["sort"] if column not in ordered]
+        ordered += [column for column in columns["range"][:1] if column not in ordered]
+        if ordered:
+            candidates[table] = ordered[:workload_max_index_columns]
+    return candidates
+
+
+def is_covered(columns: List[str], existing: Iterable[Dict[str, Any]]) -> bool:
+    """
+    Whether an existing index starts with all of the candidate's columns, or is a unique
+    index (the primary key included) on the candidate's leading columns: a lookup on those
+    already finds at most one row.
+    """
+    wanted = [column.lower() for column in columns]
+    for index in existing:
+        index_columns = [column.lower() for column in index["columns"]]
+        if index_columns[:len(wanted)] == wanted:
+            return True
+        if index["unique"] and index_columns and wanted[:len(index_columns)] == index_columns:
+            return True
+    return False
+
+
+def recommend_indexes(ranked: List[Dict[str, Any]], existing: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                      schema: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Proposes one index per table and column list across the ranked fingerprints, skipping
+    column lists an existing index (the primary key included) already leads with, ordered
+    by the query time they would serve.
+
+    :param existing: Table -> its indexes, see load_indexes.
+    """
+    proposals: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+    existing = {table.lower(): indexes for table, indexes in (existing or {}).items()}
+    for entry in ranked:
+        if entry["errors"] == entry["calls"]:
+            continue
+        for table, columns in index_columns(entry["sample_query"], schema).items():
+            if is_covered(columns, existing.get(table.lower(), [])):
+                continue
+            key = (table, tuple(columns))
+            # MySQL index names are limited to 64 characters
+            name = f"idx_{table}_{'_'.join(columns)}"[:64]
+            proposal = proposals.setdefault(key, {
+                "table": table,
+                "columns": columns,
+                "statement": f"CREATE INDEX `{name}` ON `{table}` ({', '.join(f'`{column}`' for column in columns)});",
+                "total_ms": 0.0,
+                "calls": 0,
+                "fingerprints": [],
+                "full_scan": False,
+            })
+            proposal["total_ms"] += entry["total_ms"]
+            proposal["calls"] += entry["calls"]
+            proposal["fingerprints"].append(entry["fingerprint"][:12])
+            proposal["full_scan"] |= table in (entry["full_scans"] or [])
+    return sorted(proposals.values(), key=lambda proposal: proposal["total_ms"], reverse=True)
+
+
+def load_indexes(connection: Any, database: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Reads every index of a MySQL database from information_schema.STATISTICS, as
+    table -> [{"name", "columns", "unique"}].
+    """
+    indexes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+            (database,),
+        )
+        for row in cursor.fetchall():
+            table, index, column, non_unique = row if isinstance(row, (tuple, list)) else tuple(row.values())
+            entry = indexes.setdefault((table, index), {"name": index, "columns": [], "unique": not int(non_unique)})
+            entry["columns"].append(column)
+    finally:
+        cursor.close()
+    by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for (table, _), entry in indexes.items():
+        by_table[table].append(entry)
+    return dict(by_table)
+
+
+def report(limit: int = 20) -> Dict[str, Any]:
+    """Ranks the recorded fingerprints and proposes indexes against the live schema when reachable."""
+    ranked = get_workload_recorder().fingerprints(limit)
+    existing, schema = None, None
+    try:
+        from . import mysql_tool
+        from .mysql_setup import get_schema_index
+
+        index = get_schema_index()
+        if index is not None:
+            schema = {table: [column["name"] for column in columns] for table, columns in index.schema().items()}
+        with mysql_tool.get_connection_pool().connection() as connection:
+            existing = load_indexes(connection, mysql_tool.db_name)
+    except Exception as e:
+        print(f"Existing indexes unavailable, proposing without them: {e}")
+    return {"fingerprints": ranked, "indexes": recommend_indexes(ranked, existing, schema)}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--limit", type=int, default=20, help="Fingerprints to rank.")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file.")
+    args = parser.parse_args(argv)
+
+    from tabulate import tabulate
+
+    result = report(args.limit)
+    columns = ["fingerprint", "calls", "errors", "total_ms", "avg_ms", "p95_ms", "max_ms", "avg_rows", "full_scans"]
+    print(tabulate(
+        [[entry["fingerprint"][:12]] + [entry[column] for column in columns[1:]] for entry in result["fingerprints"]],
+        headers=columns, floatfmt=".1f",
+    ))
+    for entry in result["fingerprints"]:
+        print(f"\n{entry['fingerprint'][:12]}: {entry['template']}")
+    print("\nProposed indexes:")
+    for proposal in result["indexes"]:
+        scan = " (full scan today)" if proposal["full_scan"] else ""
+        print(f"  {proposal['statement']}  -- {proposal['total_ms']:.0f}ms over {proposal['calls']} calls{scan}")
+    if args.json_path:
+        with open(args.json_path, "wb") as f:
+            f.write(to_json_bytes(result, indent=True))
+    return result
+
+
+if __name__ == "__main__":
+    main()
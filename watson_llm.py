@@ -1,8 +1,8 @@
 
 from dotenv import load_dotenv
 import os
+import threading
 load_dotenv()
-from langchain_ibm import WatsonxLLM
 
 credentials = {
     "url": "https://eu-de.ml.cloud.ibm.com",
@@ -22,31 +22,61 @@ models = {"ibm" : "ibm/granite-13b-chat-v2",
           }
 
 
-watsonx_llm = WatsonxLLM(
-    model_id =  "meta-llama/llama-3-1-70b-instruct",
-    url = credentials.get("url"),
-    apikey = credentials.get("apikey"),
-    project_id =  credentials.get("project_id"),
-    params = param
-    )
+# The clients are built on first use, not at import: building them contacts watsonx and
+# needs credentials, so importing this module (and with it agent.py) used to fail offline,
+# e.g. under the benchmark harness with its fake LLM (benchmarks/run.py)
+_watsonx_llm = None
+_pandasai_llm = None
+_llm_lock = threading.Lock()
 
 
-from pandasai import SmartDataframe
-from pandasai.llm import IBMwatsonx
+def get_watsonx_llm():
+    """Builds the langchain watsonx client on first use and returns the shared instance."""
+    global _watsonx_llm
+    with _llm_lock:
+        if _watsonx_llm is None:
+            from langchain_ibm import WatsonxLLM
 
+            _watsonx_llm = WatsonxLLM(
+                model_id =  "meta-llama/llama-3-1-70b-instruct",
+                url = credentials.get("url"),
+                apikey = credentials.get("apikey"),
+                project_id =  credentials.get("project_id"),
+                params = param
+                )
+        return _watsonx_llm
 
-# config for pandas.ai
-llm = IBMwatsonx(
-    model=models["llama"],
-    api_key=credentials.get("apikey"),
-    watsonx_url=credentials.get("url"),
-    watsonx_project_id=credentials.get("project_id"),
-    decoding_method= "greedy",
-    temperature= 0.6, 
-    min_new_tokens= 1000,
-    max_new_tokens= 2500,
-    stop_sequences= ['\nObservation', '\n\n']
-)
+
+def get_pandasai_llm():
+    """Builds the pandasai watsonx client on first use and returns the shared instance."""
+    global _pandasai_llm
+    with _llm_lock:
+        if _pandasai_llm is None:
+            from pandasai.llm import IBMwatsonx
+
+            # config for pandas.ai
+            _pandasai_llm = IBMwatsonx(
+                model=models["llama"],
+                api_key=credentials.get("apikey"),
+                watsonx_url=credentials.get("url"),
+                watsonx_project_id=credentials.get("project_id"),
+                decoding_method= "greedy",
+                temperature= 0.6, 
+                min_new_tokens= 1000,
+                max_new_tokens= 2500,
+                stop_sequences= ['\nObservation', '\n\n']
+            )
+        return _pandasai_llm
+
+
+def __getattr__(name):
+    # `from watson_llm import watsonx_llm` and `from watson_llm import llm` keep working, but the
+    # clients are only built when first asked for
+    if name == "watsonx_llm":
+        return get_watsonx_llm()
+    if name == "llm":
+        return get_pandasai_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if "__name__"=="__main__":
     response = llm.invoke("Explain polymorphsm in Java")
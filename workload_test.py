@@ -0,0 +1,71 @@
+"""
+Index advice from the recorded workload. Run under pytest:
+
+    python -m pytest workload_test.py
+"""
+from tools.workload import index_columns, is_covered, recommend_indexes
+
+SCHEMA = {
+    "Sale_Report": ["id", "order_date", "customer_id", "product_id", "country", "quantity", "amount"],
+    "Customer": ["id", "name", "email", "country"],
+    "Product": ["id", "name", "category", "price"],
+}
+PRIMARY_KEYS = {table: [{"name": "PRIMARY", "columns": ["id"], "unique": True}] for table in SCHEMA}
+
+JOIN = ("SELECT c.country, SUM(s.amount) FROM Sale_Report s JOIN Customer c ON s.customer_id = c.id "
+        "WHERE c.country = 'France' GROUP BY c.country")
+REVERSED_JOIN = ("SELECT * FROM Customer c JOIN Sale_Report s ON c.id = s.customer_id "
+                 "WHERE s.order_date > '2024-01-01'")
+COMMA_JOIN = ("SELECT * FROM Sale_Report, Product WHERE Sale_Report.product_id = Product.id "
+              "AND Product.category = 'Top'")
+
+
+def ranked(query, total_ms=100.0):
+    return [{"fingerprint": "f" * 40, "calls": 4, "errors": 0, "total_ms": total_ms,
+             "full_scans": ["Sale_Report"], "sample_query": query}]
+
+
+def test_join_indexes_only_the_probed_side():
+    assert index_columns(JOIN, SCHEMA) == {"Customer": ["id", "country"]}
+    assert index_columns(REVERSED_JOIN, SCHEMA) == {"Sale_Report": ["customer_id", "order_date"]}
+    assert index_columns(COMMA_JOIN, SCHEMA) == {"Product": ["id", "category"]}
+
+
+def test_equality_then_sort_then_range():
+    query = "SELECT * FROM Sale_Report WHERE country = 'Spain' AND amount > 10 ORDER BY order_date"
+    assert index_columns(query) == {"Sale_Report": ["country", "order_date", "amount"]}
+
+
+def test_like_is_a_range_only_with_a_literal_prefix():
+    assert index_columns("SELECT * FROM t WHERE a = 1 AND b LIKE '%x' ORDER BY c") == {"t": ["a", "c"]}
+    assert index_columns("SELECT * FROM t WHERE a = 1 AND b LIKE '_x' ORDER BY c") == {"t": ["a", "c"]}
+    assert index_columns("SELECT * FROM t WHERE a = 1 AND b LIKE 'x%' ORDER BY c") == {"t": ["a", "c", "b"]}
+
+
+def test_is_covered():
+    non_unique = [{"name": "ix", "columns": ["a", "b"], "unique": False}]
+    assert is_covered(["a"], non_unique)
+    assert is_covered(["a", "b"], non_unique)
+    assert not is_covered(["a", "b", "c"], non_unique)
+    assert not is_covered(["b"], non_unique)
+    assert is_covered(["id", "country"], PRIMARY_KEYS["Customer"])
+    assert not is_covered(["country", "id"], PRIMARY_KEYS["Customer"])
+
+
+def test_recommendations_skip_primary_key_lookups():
+    assert recommend_indexes(ranked(JOIN), PRIMARY_KEYS, SCHEMA) == []
+    assert [proposal["statement"] for proposal in recommend_indexes(ranked(REVERSED_JOIN), PRIMARY_KEYS, SCHEMA)] == [
+        "CREATE INDEX `idx_Sale_Report_customer_id_order_date` ON `Sale_Report` (`customer_id`, `order_date`);"
+    ]
+    assert recommend_indexes(ranked(COMMA_JOIN), PRIMARY_KEYS, SCHEMA) == []
+
+
+def test_recommendations_are_merged_and_ranked_by_time():
+    like = "SELECT * FROM Sale_Report WHERE country = 'Spain' AND amount LIKE '%5' ORDER BY order_date"
+    entries = ranked(like, 50.0) + ranked(REVERSED_JOIN, 200.0) + ranked(like.replace("Spain", "Peru"), 70.0)
+    proposals = recommend_indexes(entries, PRIMARY_KEYS, SCHEMA)
+    assert [(proposal["columns"], proposal["total_ms"], proposal["calls"]) for proposal in proposals] == [
+        (["customer_id", "order_date"], 200.0, 4),
+        (["country", "order_date"], 120.0, 8),
+    ]
+    assert all(proposal["full_scan"] for proposal in proposals)